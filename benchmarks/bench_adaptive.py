@@ -0,0 +1,181 @@
+"""Compare fixed and learned auto-off delays on synthetic occupancy.
+
+Generates motion histories for two kinds of rooms and replays each with
+``adaptive_auto_off`` off and on, reporting lights-on hours and how often a
+light was turned on again within a minute of switching off:
+
+- **through**: people walk through at random (Poisson visits), one motion
+  pulse per visit. Nobody is left in the dark by a short delay, so learning
+  must not keep these lights on longer than the fixed delay does.
+- **sitting**: people stay for a while and only move now and then, with
+  pauses that often outlast the fixed delay.
+
+    python -m benchmarks.bench_adaptive --rooms 10 --days 28
+
+Shorter delays switch lights off, and so on again, more often: learning
+trades service calls for lights-on hours. It fails when, compared with the
+fixed delay,
+
+- through traffic keeps its lights on longer,
+- a switch-off is more often followed by motion within a minute (relit
+  share, over MAX_RELIT_SHARE_INCREASE more), or
+- the service calls grow more than MAX_CALL_GROWTH times.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timezone
+
+from .replay import Replay
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+MAX_RELIT_SHARE_INCREASE = 0.02
+MAX_CALL_GROWTH = 1.5
+
+
+def through_traffic(rng, args):
+    """Motion pulses (start, end) of people walking through."""
+    horizon = args.days * 86400
+    now = rng.expovariate(1 / (args.visit_gap * 60))
+    while now < horizon:
+        hold = rng.uniform(5, 120)
+        yield now, now + hold
+        now += hold + rng.expovariate(1 / (args.visit_gap * 60))
+
+
+def sitting(rng, args):
+    """Motion pulses of people staying a while and moving now and then."""
+    horizon = args.days * 86400
+    now = rng.expovariate(1 / (args.session_gap * 3600))
+    while now < horizon:
+        for _ in range(rng.randint(5, 40)):
+            hold = rng.uniform(10, 60)
+            yield now, now + hold
+            now += hold + rng.expovariate(1 / (args.pause * 60))
+        now += rng.expovariate(1 / (args.session_gap * 3600))
+
+
+SCENARIOS = {"through": through_traffic, "sitting": sitting}
+
+
+def write_history(path, scenario, args):
+    rng = random.Random(args.seed)
+    records = []
+    for room in range(args.rooms):
+        sensor = f"binary_sensor.{scenario}_{room}"
+        for start, end in SCENARIOS[scenario](rng, args):
+            records.append((START + start, sensor, "on"))
+            records.append((START + end, sensor, "off"))
+    records.sort()
+    with open(path, "w", encoding="utf-8") as out:
+        for timestamp, sensor, state in records:
+            out.write(
+                json.dumps(
+                    {
+                        "ts": timestamp,
+                        "entity_id": sensor,
+                        "state": state,
+                        "attributes": {"device_class": "motion"},
+                    }
+                )
+                + "\n"
+            )
+
+
+def replay(path, scenario, args, adaptive):
+    replay_args = argparse.Namespace(
+        history=path, warmup=0, tail=3600, manual_lights=False, device_latency=0.15
+    )
+    lights = [
+        {
+            "light_entity": f"light.{scenario}_{room}",
+            "motion_sensors": [f"binary_sensor.{scenario}_{room}"],
+            "auto_off_delay": args.auto_off_delay,
+        }
+        for room in range(args.rooms)
+    ]
+    run = Replay(replay_args, lights, {"adaptive_auto_off": adaptive})
+    try:
+        return run.hass.loop.run_until_complete(run.run())
+    finally:
+        run.hass.loop.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--days", type=float, default=28)
+    parser.add_argument("--auto-off-delay", type=float, default=5, help="minutes")
+    parser.add_argument(
+        "--visit-gap", type=float, default=10, help="minutes between walk throughs"
+    )
+    parser.add_argument(
+        "--pause", type=float, default=3, help="mean minutes people sit still"
+    )
+    parser.add_argument(
+        "--session-gap", type=float, default=3, help="mean hours between stays"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for scenario in SCENARIOS:
+            path = os.path.join(folder, f"{scenario}.jsonl")
+            write_history(path, scenario, args)
+            for adaptive in (False, True):
+                result = replay(path, scenario, args, adaptive)
+                results[(scenario, adaptive)] = {
+                    "lights_on_hours": result["lights_on_hours"],
+                    "relit_within_minute": result["relit_within_minute"],
+                    "service_calls": sum(result["service_calls"].values()),
+                    "relit_share": round(
+                        result["relit_within_minute"]
+                        / max(result["service_calls"].get("turn_off", 0), 1),
+                        3,
+                    ),
+                }
+
+    if args.json:
+        print(
+            json.dumps(
+                [
+                    {"scenario": scenario, "adaptive": adaptive, **values}
+                    for (scenario, adaptive), values in results.items()
+                ]
+            )
+        )
+    else:
+        for (scenario, adaptive), values in results.items():
+            label = f"{scenario}, {'learned' if adaptive else 'fixed'}"
+            print(f"{label:>18}: {values}")
+
+    problems = []
+    fixed = results[("through", False)]["lights_on_hours"]
+    learned = results[("through", True)]["lights_on_hours"]
+    if learned > fixed:
+        problems.append(
+            f"through traffic lights stayed on {learned} hours instead of {fixed}"
+        )
+    for scenario in SCENARIOS:
+        fixed, learned = results[(scenario, False)], results[(scenario, True)]
+        if learned["relit_share"] > fixed["relit_share"] + MAX_RELIT_SHARE_INCREASE:
+            problems.append(
+                f"{scenario}: relit share {learned['relit_share']}"
+                f" instead of {fixed['relit_share']}"
+            )
+        if learned["service_calls"] > fixed["service_calls"] * MAX_CALL_GROWTH:
+            problems.append(
+                f"{scenario}: {learned['service_calls']} service calls"
+                f" instead of {fixed['service_calls']}"
+            )
+    if problems:
+        raise SystemExit("Learned delays:\n" + "\n".join(problems))
+
+
+if __name__ == "__main__":
+    main()
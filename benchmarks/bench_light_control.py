@@ -0,0 +1,307 @@
+"""Synthetic load benchmark for the light control integration.
+
+Creates N lights sharing M motion sensors on a fake Home Assistant core with
+a virtual clock, plays back Poisson motion traffic and reports latency,
+scheduler cost, memory and service call volume.
+
+    python -m benchmarks.bench_light_control --lights 300 --sensors 60 --hours 4
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import random
+import time
+import tracemalloc
+import types
+
+from . import fake_hass
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@types.coroutine
+def timed(coro, sink):
+    """Drive a coroutine, adding the wall time of its synchronous steps to sink."""
+    spent = 0.0
+    value, error = None, None
+    while True:
+        start = time.perf_counter()
+        try:
+            if error is not None:
+                yielded = coro.throw(error)
+            else:
+                yielded = coro.send(value)
+        except StopIteration as stop:
+            sink.append(spent + time.perf_counter() - start)
+            return stop.value
+        spent += time.perf_counter() - start
+        try:
+            value, error = (yield yielded), None
+        except BaseException as err:  # pylint: disable=broad-except
+            value, error = None, err
+
+
+class LoadModel:
+    """Wires the synthetic home together and collects measurements."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.hass = fake_hass.new_hass()
+        self.loop = self.hass.loop
+        self.lights = [f"light.bench_{i}" for i in range(args.lights)]
+        self.sensors = [f"binary_sensor.motion_{i}" for i in range(args.sensors)]
+        self.sensors_by_light = {}
+        self.lights_by_sensor = {sensor: [] for sensor in self.sensors}
+        self.motion_at = {}  # light -> virtual time of the motion waiting for light
+        self.latencies = []
+        self.check_costs = []  # (virtual time, seconds)
+        self.setup_seconds = 0.0
+        self.bytes_per_light = 0.0
+        self.motion_events = 0
+        self.turning_on = set()  # lights commanded on, not reported on yet
+
+    async def _handle_light_service(self, call):
+        entity_ids = call.data["entity_id"]
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        new_state = "on" if call.service == "turn_on" else "off"
+        now = self.loop.time()
+        for entity_id in entity_ids:
+            if new_state == "on":
+                self.turning_on.add(entity_id)
+                if entity_id in self.motion_at:
+                    self.latencies.append(now - self.motion_at.pop(entity_id))
+        # Emulate the radio round trip before the device reports back
+        await asyncio.sleep(self.args.device_latency)
+        for entity_id in entity_ids:
+            self.turning_on.discard(entity_id)
+            self.hass.states.async_set(entity_id, new_state)
+
+    def _instrument(self):
+        """Time every check_timeout run without touching the integration."""
+        light_control = importlib.import_module(f"{fake_hass.PACKAGE}.light_control")
+        original = light_control.LightControl.check_timeout
+        model = self
+
+        def check_timeout(self):
+            sink = []
+
+            async def run():
+                await timed(original(self), sink)
+                model.check_costs.append((model.loop.time(), sink[0]))
+
+            return run()
+
+        light_control.LightControl.check_timeout = check_timeout
+        return original
+
+    async def setup(self):
+        hass = self.hass
+        fake_hass.install(hass)
+        if self.args.table_backend == "array":
+            state_table = importlib.import_module(f"{fake_hass.PACKAGE}.state_table")
+            state_table.np = None
+        hass.services.async_register("light", "turn_on", self._handle_light_service)
+        hass.services.async_register("light", "turn_off", self._handle_light_service)
+        if self.args.command_rate is not None:
+            integration = importlib.import_module(fake_hass.PACKAGE)
+            integration._async_domain_data(hass)["batcher"].configure(
+                self.args.command_rate, self.args.command_burst
+            )
+
+        for sensor in self.sensors:
+            hass.states.async_set(sensor, "off", {"device_class": "motion"})
+        for index, light in enumerate(self.lights):
+            # Every light starts on so the integration takes over its timeout
+            hass.states.async_set(light, "on")
+            count = 1 + (index % self.args.sensors_per_light)
+            sensors = self.rng.sample(self.sensors, min(count, len(self.sensors)))
+            self.sensors_by_light[light] = sensors
+            for sensor in sensors:
+                self.lights_by_sensor[sensor].append(light)
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        for index, light in enumerate(self.lights):
+            entry = fake_hass.FakeConfigEntry(
+                {"name": light, "light_entity": light},
+                {
+                    "motion_sensors": self.sensors_by_light[light],
+                    "auto_off_delay": self.args.auto_off_delay,
+                    "illuminance_threshold": 0,
+                    # A corridor: each light leads to the next few
+                    "adjacent_lights": self.lights[index + 1 : index + 1 + self.args.adjacent],
+                },
+            )
+            await hass.config_entries.async_add(entry)
+        self.setup_seconds = time.perf_counter() - start
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        self.bytes_per_light = grown / max(1, len(self.lights))
+
+        # Put every light under integration control
+        for light in self.lights:
+            hass.states.async_set(light, "off")
+            hass.states.async_set(light, "on")
+        await hass.async_block_till_done()
+
+    def schedule_motion(self):
+        """Pre-plan Poisson motion pulses for every sensor."""
+        horizon = self.args.hours * 3600
+        rate = self.args.events_per_hour / 3600
+        for sensor in self.sensors:
+            now = self.rng.expovariate(rate)
+            while now < horizon:
+                hold = self.rng.uniform(5, self.args.max_hold)
+                self.loop.call_at(now, self._motion, sensor, "on")
+                # Chattering hardware drops and re-reports motion right away
+                for index in range(self.args.chatter):
+                    blip = now + 0.2 * (index + 1)
+                    self.loop.call_at(blip, self._motion, sensor, "off")
+                    self.loop.call_at(blip + 0.1, self._motion, sensor, "on")
+                self.loop.call_at(now + hold, self._motion, sensor, "off")
+                now += hold + self.rng.expovariate(rate)
+
+    def _motion(self, sensor, state):
+        if state == "on":
+            self.motion_events += 1
+            now = self.loop.time()
+            for light in self.lights_by_sensor[sensor]:
+                light_state = self.hass.states.get(light)
+                if (
+                    light_state
+                    and light_state.state == "off"
+                    and light not in self.turning_on
+                ):
+                    self.motion_at.setdefault(light, now)
+        self.hass.states.async_set(sensor, state, {"device_class": "motion"})
+
+    async def run(self):
+        original = self._instrument()
+        try:
+            await self.setup()
+            calls_before = len(self.hass.services.calls)
+            self.schedule_motion()
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            await asyncio.sleep(self.args.hours * 3600)
+            await self.hass.async_block_till_done()
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            for entry_id in list(self.hass.config_entries.entries):
+                await self.hass.config_entries.async_unload(entry_id)
+        finally:
+            light_control = importlib.import_module(
+                f"{fake_hass.PACKAGE}.light_control"
+            )
+            light_control.LightControl.check_timeout = original
+        return self.report(self.hass.services.calls[calls_before:], wall, cpu)
+
+    def report(self, calls, wall, cpu):
+        ticks = {}
+        for when, cost in self.check_costs:
+            ticks[when] = ticks.get(when, 0.0) + cost
+        tick_costs = list(ticks.values())
+        commanded = sum(
+            len(data["entity_id"]) if isinstance(data["entity_id"], list) else 1
+            for _, _, _, data in calls
+        )
+        metrics = self.hass.data["haas_intelli_lights"]["metrics"]
+        ms = lambda value: None if value is None else round(value * 1000, 3)
+        return {
+            "lights": len(self.lights),
+            "table_backend": self.hass.data["haas_intelli_lights"]["table"].backend,
+            "sensors": len(self.sensors),
+            "simulated_hours": self.args.hours,
+            "motion_events": self.motion_events,
+            "setup_ms_total": ms(self.setup_seconds),
+            "memory_bytes_per_light": round(self.bytes_per_light),
+            "motion_to_call_ms": {
+                "count": len(self.latencies),
+                "p50": ms(percentile(self.latencies, 0.50)),
+                "p95": ms(percentile(self.latencies, 0.95)),
+                "p99": ms(percentile(self.latencies, 0.99)),
+                "max": ms(max(self.latencies, default=None)),
+            },
+            "scheduler_tick_cpu_ms": {
+                "ticks": len(tick_costs),
+                "p50": ms(percentile(tick_costs, 0.50)),
+                "p99": ms(percentile(tick_costs, 0.99)),
+                "max": ms(max(tick_costs, default=None)),
+            },
+            "service_calls": len(calls),
+            "motion_events_suppressed": metrics.events_suppressed,
+            "command_outcomes": dict(metrics.commands),
+            "preactivations": dict(metrics.preactivations),
+            "command_queue_peak": metrics.command_queue_peak,
+            "command_wait_ms": {
+                service: {
+                    "p95": ms(metrics.command_wait_percentile(service, 0.95)),
+                    "max": ms(metrics.command_wait_max.get(service, 0.0)),
+                }
+                for service in sorted(metrics.command_wait)
+            },
+            "state_store_writes": self.hass.data["haas_intelli_lights"]["store"]._store.saves,
+            "entities_commanded": commanded,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lights", type=int, default=100)
+    parser.add_argument("--sensors", type=int, default=25)
+    parser.add_argument("--sensors-per-light", type=int, default=2)
+    parser.add_argument("--events-per-hour", type=float, default=6)
+    parser.add_argument(
+        "--chatter", type=int, default=0, help="extra off/on blips per motion pulse"
+    )
+    parser.add_argument("--max-hold", type=float, default=120, help="seconds")
+    parser.add_argument("--auto-off-delay", type=float, default=2, help="minutes")
+    parser.add_argument("--device-latency", type=float, default=0.15, help="seconds")
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument(
+        "--command-rate", type=float, default=None,
+        help="lights commanded per second, 0 for no limit (default: integration's)",
+    )
+    parser.add_argument("--command-burst", type=int, default=40)
+    parser.add_argument(
+        "--adjacent", type=int, default=0,
+        help="pre-activate this many following lights on motion",
+    )
+    parser.add_argument(
+        "--table-backend", choices=("auto", "array"), default="auto",
+        help="force the array backed state table even if numpy is installed",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    model = LoadModel(args)
+    result = model.loop.run_until_complete(model.run())
+    model.loop.close()
+    if args.json:
+        print(json.dumps(result))
+        return
+    for key, value in result.items():
+        print(f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""Lightweight stand-in for the parts of Home Assistant the integration uses.
+
+Only ``hass.states``, ``hass.bus``, ``hass.services`` and the config entry
+plumbing are faked; the integration itself is imported unchanged. Everything
+runs on an event loop with a virtual clock, so hours of activity replay in
+seconds of wall time.
+"""
+
+import asyncio
+import importlib
+import selectors
+import sys
+from datetime import datetime, timedelta
+from itertools import count
+
+PACKAGE = "custom_components.homeassistant_inteligent_ights"
+EPOCH = datetime(2024, 1, 1)
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock jumps straight to the next scheduled timer."""
+
+    def __init__(self):
+        self._virtual_now = 0.0
+        super().__init__(_VirtualSelector(self))
+
+    def time(self):
+        return self._virtual_now
+
+    def advance(self, seconds):
+        self._virtual_now += seconds
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Never blocks, advances the loop clock by the requested timeout."""
+
+    def __init__(self, loop):
+        super().__init__()
+        self._loop = loop
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("Virtual loop is idle with nothing scheduled")
+        if timeout > 0:
+            self._loop.advance(timeout)
+        return super().select(0)
+
+
+class FakeState:
+    """Minimal State object."""
+
+    __slots__ = ("entity_id", "state", "attributes", "last_changed", "last_updated")
+
+    def __init__(self, entity_id, state, attributes=None, last_changed=None):
+        self.entity_id = entity_id
+        self.state = state
+        self.attributes = attributes or {}
+        self.last_changed = last_changed
+        self.last_updated = last_changed
+
+    @property
+    def domain(self):
+        return self.entity_id.split(".", 1)[0]
+
+    def __repr__(self):
+        return f"<state {self.entity_id}={self.state}>"
+
+
+class FakeEvent:
+    """Minimal Event object."""
+
+    __slots__ = ("event_type", "data", "time_fired")
+
+    def __init__(self, event_type, data, time_fired=None):
+        self.event_type = event_type
+        self.data = data
+        self.time_fired = time_fired
+
+
+class FakeStates:
+    """State machine firing state_changed to per-entity listeners."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._states = {}
+        self.listeners = {}  # entity_id -> list of actions
+
+    def get(self, entity_id):
+        return self._states.get(entity_id)
+
+    def async_all(self, domain_filter=None):
+        if domain_filter is None:
+            return list(self._states.values())
+        if isinstance(domain_filter, str):
+            domain_filter = (domain_filter,)
+        return [s for s in self._states.values() if s.domain in domain_filter]
+
+    def async_entity_ids(self, domain_filter=None):
+        return [s.entity_id for s in self.async_all(domain_filter)]
+
+    def async_set(self, entity_id, new_state, attributes=None):
+        old_state = self._states.get(entity_id)
+        if attributes is None and old_state is not None:
+            attributes = old_state.attributes
+        if (
+            old_state is not None
+            and old_state.state == new_state
+            and old_state.attributes == attributes
+        ):
+            return
+        state = FakeState(entity_id, new_state, attributes, self._hass.now())
+        self._states[entity_id] = state
+        self._fire(entity_id, old_state, state)
+
+    def async_remove(self, entity_id):
+        old_state = self._states.pop(entity_id, None)
+        if old_state is not None:
+            self._fire(entity_id, old_state, None)
+
+    def _fire(self, entity_id, old_state, new_state):
+        event = FakeEvent(
+            "state_changed",
+            {"entity_id": entity_id, "old_state": old_state, "new_state": new_state},
+            self._hass.now(),
+        )
+        for action in list(self.listeners.get(entity_id, ())):
+            self._hass.async_run_job(action, event)
+        self._hass.bus.async_fire_internal(event)
+
+
+class FakeBus:
+    """Event bus supporting the listener styles used by the integration."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self.listeners = {}  # event_type -> list of actions
+
+    def listener_count(self):
+        return sum(len(actions) for actions in self.listeners.values())
+
+    def async_listen(self, event_type, action, *args, **kwargs):
+        actions = self.listeners.setdefault(event_type, [])
+        actions.append(action)
+
+        def remove():
+            if action in actions:
+                actions.remove(action)
+
+        return remove
+
+    def async_listen_once(self, event_type, action):
+        remove = None
+
+        def once(event):
+            remove()
+            return action(event)
+
+        remove = self.async_listen(event_type, once)
+        return remove
+
+    def async_fire(self, event_type, event_data=None):
+        self.async_fire_internal(FakeEvent(event_type, event_data or {}))
+
+    def async_fire_internal(self, event):
+        for action in list(self.listeners.get(event.event_type, ())):
+            self._hass.async_run_job(action, event)
+
+
+class FakeServiceCall:
+    """Minimal ServiceCall object."""
+
+    __slots__ = ("domain", "service", "data")
+
+    def __init__(self, domain, service, data):
+        self.domain = domain
+        self.service = service
+        self.data = data
+
+
+class FakeServices:
+    """Service registry that records every call it receives."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._handlers = {}
+        self.calls = []  # (virtual time, domain, service, data)
+
+    def async_register(self, domain, service, handler, *args, **kwargs):
+        self._handlers[(domain, service)] = handler
+
+    def has_service(self, domain, service):
+        return (domain, service) in self._handlers
+
+    async def async_call(self, domain, service, service_data=None, blocking=False, **kwargs):
+        service_data = dict(service_data or {})
+        self.calls.append((self._hass.loop.time(), domain, service, service_data))
+        handler = self._handlers.get((domain, service))
+        if handler is None:
+            return None
+        result = handler(FakeServiceCall(domain, service, service_data))
+        if asyncio.iscoroutine(result):
+            if blocking:
+                return await result
+            self._hass.async_create_task(result)
+        return None
+
+
+class FakeStore:
+    """In-memory replacement for homeassistant.helpers.storage.Store."""
+
+    def __init__(self, hass, version, key, *args, **kwargs):
+        self.hass = hass
+        self.key = key
+        self.data = None
+        self.saves = 0
+        self._handle = None
+
+    async def async_load(self):
+        return self.data
+
+    async def async_save(self, data):
+        self.saves += 1
+        self.data = data
+
+    def async_delay_save(self, data_func, delay=0):
+        if self._handle is None:
+            self._handle = self.hass.loop.call_later(delay, self._write, data_func)
+
+    def _write(self, data_func):
+        self._handle = None
+        self.saves += 1
+        self.data = data_func()
+
+
+class FakeEntityRegistry:
+    """Empty entity registry, benchmark lights are not placed in areas."""
+
+    def async_get(self, entity_id):
+        return None
+
+
+class FakeConfig:
+    """Subset of hass.config."""
+
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+        self.latitude = 52.37
+        self.longitude = 4.89
+        self.elevation = 0
+        self.time_zone = "UTC"
+
+    def path(self, *parts):
+        return "/".join((self.config_dir,) + parts)
+
+
+class FakeConfigEntry:
+    """Config entry with the hooks async_setup_entry relies on."""
+
+    _ids = count()
+
+    def __init__(self, data, options=None, title=None):
+        self.entry_id = f"bench_{next(self._ids)}"
+        self.domain = "haas_intelli_lights"
+        self.title = title or data.get("name", self.entry_id)
+        self.data = dict(data)
+        self.options = dict(options or {})
+        self.update_listeners = []
+        self._on_unload = []
+
+    def add_update_listener(self, listener):
+        self.update_listeners.append(listener)
+        return lambda: self.update_listeners.remove(listener)
+
+    def async_on_unload(self, func):
+        self._on_unload.append(func)
+
+    def run_unload_callbacks(self):
+        while self._on_unload:
+            self._on_unload.pop()()
+
+
+class FakeConfigEntries:
+    """Loads and unloads entries straight through the integration module."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self.entries = {}
+        self.entities = {}  # (platform, entry_id) -> list of added entities
+
+    def async_entries(self, domain=None):
+        return list(self.entries.values())
+
+    async def async_add(self, entry):
+        integration = importlib.import_module(PACKAGE)
+        self.entries[entry.entry_id] = entry
+        return await integration.async_setup_entry(self._hass, entry)
+
+    async def async_unload(self, entry_id):
+        integration = importlib.import_module(PACKAGE)
+        entry = self.entries.pop(entry_id)
+        result = await integration.async_unload_entry(self._hass, entry)
+        entry.run_unload_callbacks()
+        return result
+
+    async def async_reload(self, entry_id):
+        entry = self.entries[entry_id]
+        await self.async_unload(entry_id)
+        return await self.async_add(entry)
+
+    async def async_update_entry(self, entry, options):
+        entry.options = dict(options)
+        for listener in list(entry.update_listeners):
+            await listener(self._hass, entry)
+
+    async def async_forward_entry_setups(self, entry, platforms):
+        for platform in platforms:
+            module = importlib.import_module(f"{PACKAGE}.{platform}")
+            added = self.entities.setdefault((platform, entry.entry_id), [])
+
+            def add_entities(entities, update_before_add=False, _added=added):
+                for entity in entities:
+                    entity.hass = self._hass
+                    _added.append(entity)
+
+            await module.async_setup_entry(self._hass, entry, add_entities)
+
+    async def async_unload_platforms(self, entry, platforms):
+        for platform in platforms:
+            self.entities.pop((platform, entry.entry_id), None)
+        return True
+
+
+class FakeHass:
+    """The ``hass`` object handed to the integration."""
+
+    def __init__(self, loop, config_dir="/tmp/intelli_lights_bench", epoch=EPOCH):
+        self.loop = loop
+        self.epoch = epoch  # wall clock time of loop time 0
+        self.data = {"entity_registry": FakeEntityRegistry()}
+        self.config = FakeConfig(config_dir)
+        self.states = FakeStates(self)
+        self.bus = FakeBus(self)
+        self.services = FakeServices(self)
+        self.config_entries = FakeConfigEntries(self)
+        self._tasks = set()
+
+    def now(self):
+        """Virtual wall clock."""
+        return self.epoch + timedelta(seconds=self.loop.time())
+
+    def async_create_task(self, target, name=None, eager_start=False):
+        task = self.loop.create_task(target)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def async_run_job(self, action, *args):
+        if asyncio.iscoroutinefunction(action):
+            return self.async_create_task(action(*args))
+        result = action(*args)
+        if asyncio.iscoroutine(result):
+            return self.async_create_task(result)
+        return result
+
+    async def async_block_till_done(self):
+        while self._tasks:
+            # Like HA, leave failures unretrieved so the loop reports them
+            await asyncio.wait(list(self._tasks))
+        await asyncio.sleep(0)
+
+    def tracked_entity_count(self):
+        """Number of per-entity state listeners currently registered."""
+        return sum(len(actions) for actions in self.states.listeners.values())
+
+
+def track_state_change_event(hass, entity_ids, action):
+    """Replacement for homeassistant.helpers.event.async_track_state_change_event."""
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    entity_ids = [entity_id.lower() for entity_id in entity_ids]
+    for entity_id in entity_ids:
+        hass.states.listeners.setdefault(entity_id, []).append(action)
+
+    def remove():
+        for entity_id in entity_ids:
+            actions = hass.states.listeners.get(entity_id)
+            if actions and action in actions:
+                actions.remove(action)
+                if not actions:
+                    del hass.states.listeners[entity_id]
+
+    return remove
+
+
+class TrackStateChangeFiltered:
+    """Replacement for the tracker of async_track_state_change_filtered."""
+
+    def __init__(self, hass, track_states, action):
+        self._hass = hass
+        self._action = action
+        self._entities = set()
+        self.async_update_listeners(track_states)
+
+    def async_update_listeners(self, track_states):
+        listeners = self._hass.states.listeners
+        entities = {entity_id.lower() for entity_id in track_states.entities}
+        for entity_id in entities - self._entities:
+            listeners.setdefault(entity_id, []).append(self._action)
+        for entity_id in self._entities - entities:
+            actions = listeners[entity_id]
+            actions.remove(self._action)
+            if not actions:
+                del listeners[entity_id]
+        self._entities = entities
+
+    def async_remove(self):
+        self.async_update_listeners(type("TrackStates", (), {"entities": ()}))
+
+
+def virtual_datetime(hass):
+    """datetime subclass whose now() follows the virtual clock."""
+
+    class VirtualDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return hass.now()
+
+    return VirtualDatetime
+
+
+def install(hass):
+    """Import the integration and point its HA hooks at the fake core."""
+    integration = importlib.import_module(PACKAGE)
+    for platform in integration.PLATFORMS:
+        importlib.import_module(f"{PACKAGE}.{platform}")
+    for name, module in list(sys.modules.items()):
+        if not name.startswith(PACKAGE) or module is None:
+            continue
+        if hasattr(module, "async_track_state_change_event"):
+            module.async_track_state_change_event = track_state_change_event
+        if hasattr(module, "async_track_state_change_filtered"):
+            module.async_track_state_change_filtered = TrackStateChangeFiltered
+        if hasattr(module, "Store"):
+            module.Store = FakeStore
+        clock = getattr(module, "datetime", None)
+        if isinstance(clock, type) and issubclass(clock, datetime):
+            module.datetime = virtual_datetime(hass)
+
+
+def new_hass(epoch=EPOCH):
+    """Create a fake hass on a fresh virtual clock loop."""
+    loop = VirtualClockLoop()
+    asyncio.set_event_loop(loop)
+    return FakeHass(loop, epoch=epoch)
@@ -0,0 +1,374 @@
+"""Replay recorded state changes through the integration on a virtual clock.
+
+Export the history of the configured lights and sensors from the recorder
+database, then play it back offline as fast as the CPU allows and report
+the service calls the integration would have made:
+
+    python -m benchmarks.replay export --db home-assistant_v2.db \\
+        --lights lights.yaml --start 2024-01-01 --out history.jsonl
+    python -m benchmarks.replay run --lights lights.yaml --history history.jsonl \\
+        --auto-off-delay 2 5 10 --calls-out calls.jsonl
+
+``lights.yaml`` uses the format of the lights_import setup. Every value given
+for ``--auto-off-delay``/``--illuminance-threshold`` overrides all lights and
+each combination is replayed separately.
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import fake_hass
+from .bench_light_control import percentile
+
+# Attributes the integration reads, the rest is dropped from the dump
+KEPT_ATTRIBUTES = ("device_class",)
+# A light turned on again this soon after a turn-off was switched off on someone
+RELIT_WINDOW = 60
+
+EXPORT_QUERY = """
+SELECT states_meta.entity_id, states.state, states.last_updated_ts,
+       state_attributes.shared_attrs
+FROM states
+JOIN states_meta ON states.metadata_id = states_meta.metadata_id
+LEFT JOIN state_attributes ON states.attributes_id = state_attributes.attributes_id
+WHERE states_meta.entity_id IN ({entities})
+  AND states.last_updated_ts >= ? AND states.last_updated_ts < ?
+ORDER BY states.last_updated_ts
+"""
+
+
+def _utc_datetime(timestamp: float) -> datetime:
+    """Naive UTC datetime, the clock of the fake core."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _timestamp(value: str) -> float:
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def load_lights(path: str) -> list:
+    """Light configs of a lights_import style YAML/JSON file."""
+    bulk = importlib.import_module(f"{fake_hass.PACKAGE}.bulk")
+    return bulk.parse_lights_import(Path(path).read_text(encoding="utf-8"))
+
+
+def replayed_entities(lights: list) -> set:
+    """The lights and every sensor they depend on."""
+    entities = set()
+    for light in lights:
+        entities.add(light["light_entity"])
+        sensors = light.get("motion_sensors", [])
+        entities.update([sensors] if isinstance(sensors, str) else sensors)
+        if light.get("illuminance_sensor"):
+            entities.add(light["illuminance_sensor"])
+    return entities
+
+
+def export_history(db_path, entities, start, end, out):
+    """Write the recorded state changes of entities as JSON lines.
+
+    Needs the recorder schema of Home Assistant 2023.4 or newer.
+    """
+    entities = sorted(entities)
+    query = EXPORT_QUERY.format(entities=",".join("?" * len(entities)))
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    written = 0
+    try:
+        rows = connection.execute(query, (*entities, start, end))
+        for entity_id, state, timestamp, shared_attrs in rows:
+            if state is None:
+                continue
+            attributes = json.loads(shared_attrs) if shared_attrs else {}
+            record = {
+                "ts": timestamp,
+                "entity_id": entity_id,
+                "state": state,
+                "attributes": {
+                    key: attributes[key] for key in KEPT_ATTRIBUTES if key in attributes
+                },
+            }
+            out.write(json.dumps(record) + "\n")
+            written += 1
+    finally:
+        connection.close()
+    return written
+
+
+def read_history(path):
+    """Yield the records of a JSONL dump in file order."""
+    with open(path, encoding="utf-8") as history:
+        for line in history:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Replay:
+    """Plays a history dump through the integration and measures the outcome."""
+
+    def __init__(self, args, lights, overrides):
+        self.args = args
+        self.lights = [{**light, **overrides} for light in lights]
+        self.overrides = overrides
+        self.light_ids = {light["light_entity"] for light in self.lights}
+        self.lights_by_sensor = {}
+        for light in self.lights:
+            sensors = light.get("motion_sensors", [])
+            for sensor in [sensors] if isinstance(sensors, str) else sensors:
+                self.lights_by_sensor.setdefault(sensor, []).append(light["light_entity"])
+        first = next(read_history(args.history), None)
+        if first is None:
+            raise SystemExit(f"{args.history} holds no state changes")
+        self.start = first["ts"]  # timestamp of loop time 0
+        self.hass = fake_hass.new_hass(_utc_datetime(self.start))
+        self.calls = []  # (loop time, service, [entity ids])
+        self.motion_at = {}  # light -> loop time of the motion waiting for light
+        self.latencies = []
+        self.on_since = {}  # light -> loop time it was turned on
+        self.on_seconds = {}  # light -> total seconds on
+        self.records = 0
+
+    async def _handle_light_service(self, call):
+        entity_ids = call.data["entity_id"]
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        now = self.hass.loop.time()
+        self.calls.append((now, call.service, list(entity_ids)))
+        new_state = "on" if call.service == "turn_on" else "off"
+        for entity_id in entity_ids:
+            if new_state == "on" and entity_id in self.motion_at:
+                self.latencies.append(now - self.motion_at.pop(entity_id))
+        # Emulate the radio round trip before the device reports back
+        await asyncio.sleep(self.args.device_latency)
+        for entity_id in entity_ids:
+            self.hass.states.async_set(entity_id, new_state)
+
+    def _track_light(self, event):
+        """Accumulate the time every light spends on."""
+        entity_id = event.data["entity_id"]
+        if entity_id not in self.light_ids:
+            return
+        now = self.hass.loop.time()
+        new_state = event.data["new_state"]
+        if new_state is not None and new_state.state == "on":
+            self.on_since.setdefault(entity_id, now)
+        elif entity_id in self.on_since:
+            self.on_seconds[entity_id] = self.on_seconds.get(entity_id, 0.0) + (
+                now - self.on_since.pop(entity_id)
+            )
+
+    def _apply(self, record):
+        entity_id = record["entity_id"]
+        if entity_id in self.light_ids:
+            if not self.args.manual_lights:
+                return
+        elif record["state"] == "on":
+            # Motion edge, remember it to measure motion to light latency
+            for light in self.lights_by_sensor.get(entity_id, ()):
+                light_state = self.hass.states.get(light)
+                if light_state is None or light_state.state == "off":
+                    self.motion_at.setdefault(light, self.hass.loop.time())
+        self.hass.states.async_set(entity_id, record["state"], record["attributes"])
+
+    async def run(self):
+        hass = self.hass
+        fake_hass.install(hass)
+        hass.services.async_register("light", "turn_on", self._handle_light_service)
+        hass.services.async_register("light", "turn_off", self._handle_light_service)
+        hass.bus.async_listen("state_changed", self._track_light)
+
+        # Entities start where the history starts, or off until first recorded
+        initial = {}
+        for record in read_history(self.args.history):
+            if record["ts"] > self.start + self.args.warmup:
+                break
+            initial.setdefault(record["entity_id"], record)
+        for entity_id in [*self.light_ids, *self.lights_by_sensor]:
+            if entity_id not in initial:
+                hass.states.async_set(entity_id, "off")
+        for record in initial.values():
+            hass.states.async_set(
+                record["entity_id"], record["state"], record["attributes"]
+            )
+
+        entry = fake_hass.FakeConfigEntry(
+            {"name": "replay", "lights": self.lights}, title="replay"
+        )
+        await hass.config_entries.async_add(entry)
+        # Assume the integration is in charge of the lights that start off
+        for light_control in hass.data["haas_intelli_lights"]["instances"].values():
+            light_state = hass.states.get(light_control.light_entity)
+            if light_state.state == "off":
+                light_control.off_by_integration = True
+        await hass.async_block_till_done()
+
+        wall = time.perf_counter()
+        for record in read_history(self.args.history):
+            delay = record["ts"] - self.start - hass.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._apply(record)
+            self.records += 1
+        await asyncio.sleep(self.args.tail)
+        await hass.async_block_till_done()
+        wall = time.perf_counter() - wall
+
+        now = hass.loop.time()
+        for light, since in self.on_since.items():
+            self.on_seconds[light] = self.on_seconds.get(light, 0.0) + now - since
+        await hass.config_entries.async_unload(entry.entry_id)
+        return self.report(now, wall)
+
+    def report(self, span, wall):
+        ms = lambda value: None if value is None else round(value * 1000, 3)
+        services = {}
+        turned_off_at = {}
+        relit = 0
+        for when, service, entity_ids in self.calls:
+            services[service] = services.get(service, 0) + 1
+            for entity_id in entity_ids:
+                if service == "turn_off":
+                    turned_off_at[entity_id] = when
+                elif entity_id in turned_off_at:
+                    if when - turned_off_at.pop(entity_id) < RELIT_WINDOW:
+                        relit += 1
+        return {
+            "settings": self.overrides,
+            "lights": len(self.light_ids),
+            "records": self.records,
+            "simulated_hours": round(span / 3600, 2),
+            "service_calls": services,
+            "entities_commanded": sum(len(ids) for _, _, ids in self.calls),
+            "motion_to_call_ms": {
+                "count": len(self.latencies),
+                "p50": ms(percentile(self.latencies, 0.50)),
+                "p95": ms(percentile(self.latencies, 0.95)),
+                "max": ms(max(self.latencies, default=None)),
+            },
+            "lights_on_hours": round(sum(self.on_seconds.values()) / 3600, 2),
+            "relit_within_minute": relit,
+            "wall_seconds": round(wall, 3),
+            "speedup": round(span / wall) if wall else None,
+        }
+
+    def write_calls(self, out):
+        for when, service, entity_ids in self.calls:
+            moment = _utc_datetime(self.start + when)
+            out.write(
+                json.dumps(
+                    {
+                        "time": moment.isoformat(),
+                        "settings": self.overrides,
+                        "service": f"light.{service}",
+                        "entity_id": entity_ids,
+                    }
+                )
+                + "\n"
+            )
+
+
+def _export(args):
+    entities = set(args.entity)
+    if args.lights:
+        entities |= replayed_entities(load_lights(args.lights))
+    if not entities:
+        raise SystemExit("Nothing to export, pass --lights or --entity")
+    start = _timestamp(args.start) if args.start else 0.0
+    end = _timestamp(args.end) if args.end else float("inf")
+    with open(args.out, "w", encoding="utf-8") as out:
+        written = export_history(args.db, entities, start, end, out)
+    print(f"Exported {written} state changes of {len(entities)} entities to {args.out}")
+
+
+def _run(args):
+    lights = load_lights(args.lights)
+    sweeps = []
+    for key, values in (
+        ("auto_off_delay", args.auto_off_delay),
+        ("illuminance_threshold", args.illuminance_threshold),
+        ("adaptive_auto_off", args.adaptive_auto_off),
+    ):
+        if values:
+            sweeps.append([(key, value) for value in values])
+
+    calls_out = open(args.calls_out, "w", encoding="utf-8") if args.calls_out else None
+    try:
+        for combination in itertools.product(*sweeps):
+            replay = Replay(args, lights, dict(combination))
+            try:
+                result = replay.hass.loop.run_until_complete(replay.run())
+            finally:
+                replay.hass.loop.close()
+            if calls_out:
+                replay.write_calls(calls_out)
+            if args.json:
+                print(json.dumps(result))
+                continue
+            for key, value in result.items():
+                print(f"{key:>20}: {value}")
+            print()
+    finally:
+        if calls_out:
+            calls_out.close()
+
+
+def _switch(value: str) -> bool:
+    if value not in ("on", "off"):
+        raise argparse.ArgumentTypeError("expected on or off")
+    return value == "on"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="dump recorder history as JSONL")
+    export.add_argument("--db", required=True, help="recorder SQLite database")
+    export.add_argument("--lights", help="export the lights and sensors of this file")
+    export.add_argument("--entity", action="append", default=[], help="extra entity")
+    export.add_argument("--start", help="ISO date/time, UTC unless given")
+    export.add_argument("--end", help="ISO date/time, UTC unless given")
+    export.add_argument("--out", required=True)
+    export.set_defaults(func=_export)
+
+    run = commands.add_parser("run", help="replay a JSONL dump")
+    run.add_argument("--lights", required=True, help="lights_import style YAML/JSON")
+    run.add_argument("--history", required=True, help="JSONL dump to replay")
+    run.add_argument("--auto-off-delay", type=float, nargs="+", help="minutes")
+    run.add_argument("--illuminance-threshold", type=float, nargs="+")
+    run.add_argument(
+        "--adaptive-auto-off", type=_switch, nargs="+", metavar="{on,off}",
+        help="learn the auto off delay from motion gaps",
+    )
+    run.add_argument(
+        "--manual-lights", action="store_true",
+        help="also replay recorded light changes, as manual operation",
+    )
+    run.add_argument("--device-latency", type=float, default=0.15, help="seconds")
+    run.add_argument(
+        "--warmup", type=float, default=0,
+        help="seconds of history whose first states are applied before setup",
+    )
+    run.add_argument(
+        "--tail", type=float, default=3600,
+        help="seconds simulated after the last record so timers can expire",
+    )
+    run.add_argument("--calls-out", help="write every service call as JSONL")
+    run.add_argument("--json", action="store_true", help="print raw JSON")
+    run.set_defaults(func=_run)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Reload churn soak test for the light control integration.
+
+Sets up a few config entries on the fake core, then reloads them thousands
+of times (with motion and option changes in between) and checks that the
+number of listeners, timers, tasks and entities as well as the traced
+memory stay flat. Every few reloads an entry is unloaded right after motion,
+before its light handled it, and any error left by such late work fails the
+run:
+
+    python -m benchmarks.soak_reload --entries 20 --reloads 5000
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import tracemalloc
+
+from . import fake_hass
+
+
+class Soak:
+    """Reloads entries round robin and samples what the integration holds."""
+
+    def __init__(self, args):
+        self.args = args
+        self.hass = fake_hass.new_hass()
+        self.loop = self.hass.loop
+        self.entries = []
+        self.samples = []
+        self.errors = []
+        self.loop.set_exception_handler(self._loop_error)
+
+    def _loop_error(self, loop, context):
+        self.errors.append(repr(context.get("exception") or context["message"]))
+
+    async def _handle_light_service(self, call):
+        entity_ids = call.data["entity_id"]
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        new_state = "on" if call.service == "turn_on" else "off"
+        for entity_id in entity_ids:
+            self.hass.states.async_set(entity_id, new_state)
+
+    def held(self) -> dict:
+        """Everything that would pile up if a reload leaked."""
+        hass = self.hass
+        return {
+            "state_listeners": sum(len(a) for a in hass.states.listeners.values()),
+            "bus_listeners": hass.bus.listener_count(),
+            "timers": sum(not handle.cancelled() for handle in self.loop._scheduled),
+            "tasks": len(hass._tasks),
+            "entities": sum(len(added) for added in hass.config_entries.entities.values()),
+            "light_controls": len(hass.data["haas_intelli_lights"]["instances"]),
+        }
+
+    async def setup(self):
+        hass = self.hass
+        fake_hass.install(hass)
+        hass.services.async_register("light", "turn_on", self._handle_light_service)
+        hass.services.async_register("light", "turn_off", self._handle_light_service)
+        for index in range(self.args.entries):
+            sensor = f"binary_sensor.soak_{index % self.args.sensors}"
+            hass.states.async_set(sensor, "off", {"device_class": "motion"})
+            hass.states.async_set(f"light.soak_{index}", "on")
+            entry = fake_hass.FakeConfigEntry(
+                {"name": f"soak {index}", "light_entity": f"light.soak_{index}"},
+                {"motion_sensors": [sensor], "auto_off_delay": 1},
+            )
+            self.entries.append(entry)
+            await hass.config_entries.async_add(entry)
+        await hass.async_block_till_done()
+
+    async def churn(self, reload_index):
+        """Reload one entry with some traffic and an option change around it."""
+        hass = self.hass
+        entry = self.entries[reload_index % len(self.entries)]
+        sensor = entry.options["motion_sensors"][0]
+        if reload_index % 5 == 0:
+            # Past the 2 s motion debounce, unload before the light saw it
+            await asyncio.sleep(3)
+            hass.states.async_set(sensor, "on", {"device_class": "motion"})
+            await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+            await hass.config_entries.async_add(entry)
+        else:
+            hass.states.async_set(sensor, "on", {"device_class": "motion"})
+            await hass.config_entries.async_reload(entry.entry_id)
+        if reload_index % 7 == 0:
+            delay = 1 + reload_index % 3
+            await hass.config_entries.async_update_entry(
+                entry, {**entry.options, "auto_off_delay": delay}
+            )
+        hass.states.async_set(sensor, "off", {"device_class": "motion"})
+        await hass.async_block_till_done()
+
+    async def run(self):
+        await self.setup()
+        for index in range(self.args.warmup):
+            await self.churn(index)
+        gc.collect()
+        tracemalloc.start()
+        baseline = self.held()
+        for index in range(self.args.warmup, self.args.warmup + self.args.reloads):
+            await self.churn(index)
+            if (index - self.args.warmup + 1) % self.args.sample_every == 0:
+                gc.collect()
+                self.samples.append(
+                    {
+                        "reloads": index - self.args.warmup + 1,
+                        "traced_kib": round(tracemalloc.get_traced_memory()[0] / 1024, 1),
+                        **self.held(),
+                    }
+                )
+        tracemalloc.stop()
+        for entry in self.entries:
+            await self.hass.config_entries.async_unload(entry.entry_id)
+        return baseline
+
+    def check(self, baseline) -> list:
+        """Describe every way the samples are not flat."""
+        problems = list(self.errors)
+        for sample in self.samples:
+            for key, value in baseline.items():
+                if sample[key] != value:
+                    problems.append(
+                        f"{key} is {sample[key]} after {sample['reloads']} reloads,"
+                        f" {value} before"
+                    )
+        if len(self.samples) >= 2:
+            first, last = self.samples[0]["traced_kib"], self.samples[-1]["traced_kib"]
+            if last - first > self.args.max_growth_kib:
+                problems.append(
+                    f"traced memory grew {last - first:.1f} KiB"
+                    f" over {self.samples[-1]['reloads']} reloads"
+                )
+        return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20)
+    parser.add_argument("--sensors", type=int, default=5)
+    parser.add_argument("--reloads", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--sample-every", type=int, default=250)
+    parser.add_argument(
+        "--max-growth-kib", type=float, default=64,
+        help="allowed traced memory growth between the first and last sample",
+    )
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    args = parser.parse_args(argv)
+
+    soak = Soak(args)
+    baseline = soak.loop.run_until_complete(soak.run())
+    soak.loop.close()
+    problems = soak.check(baseline)
+    if args.json:
+        print(json.dumps({"baseline": baseline, "samples": soak.samples}))
+    else:
+        print("baseline", baseline)
+        for sample in soak.samples:
+            print(sample)
+    if problems:
+        raise SystemExit("Leak detected:\n" + "\n".join(problems))
+    print(f"Flat over {args.reloads} reloads")
+
+
+if __name__ == "__main__":
+    main()
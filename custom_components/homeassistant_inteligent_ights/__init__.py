@@ -1,108 +1,247 @@
 import logging
 import asyncio
 from contextlib import suppress
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.const import Platform, EVENT_HOMEASSISTANT_STOP
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
 from .light_control import LightControl
+from .scheduler import TimeoutScheduler
+from .dispatcher import MotionDispatcher
+from .batcher import CommandBatcher
+from .illuminance import IlluminanceMonitor
+from .darkness import SunDarkness
+from .mirror import LightStateMirror
+from .adjacency import AdjacencyGraph
+from .metrics import IntegrationMetrics
+from .store import LightStateStore
+from .state_table import LightStateTable
+from .zones import ZoneManager
+from .profiler import HotPathProfiler
+from .bulk import is_bulk_config, light_configs
 from .const import (
     DOMAIN,
-    CONF_GLOBAL_TOGGLE,
+    CONF_ZONES,
     LIGHT_ENTYTY_INPUT_NAME,
-    ILLUMINANCE_THRESHOLD_INPUT_NAME,
-    MOTION_SENSOR_INPUT_NAME,
-    AUTO_OFF_DELAY_INPUT_NAME,
-    ILLUMMINANCE_SENSOR_INPUT_NAME,
+    MAX_CONCURRENT_LIGHTS,
+    SERVICE_PROFILE,
+    PROFILE_MODES,
+    PROFILE_MODE_TIMING,
+    DEFAULT_PROFILE_DURATION,
+    CONF_COMMAND_RATE,
+    CONF_COMMAND_BURST,
+    CONF_COMMAND_RATES,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_COMMAND_BURST,
 )
 
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.SWITCH]
+PLATFORMS = [Platform.SWITCH, Platform.SENSOR]
 
-CHECK_INTERVAL = 10
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("duration", default=DEFAULT_PROFILE_DURATION): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+        vol.Optional("mode", default=PROFILE_MODE_TIMING): vol.In(PROFILE_MODES),
+    }
+)
+
+
+# Lights per second, 0 sends without pacing
+_RATE = vol.All(vol.Coerce(float), vol.Range(min=0))
+_BURST = vol.All(vol.Coerce(int), vol.Range(min=1))
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema(
+            {
+                vol.Optional(CONF_COMMAND_RATE, default=DEFAULT_COMMAND_RATE): _RATE,
+                vol.Optional(CONF_COMMAND_BURST, default=DEFAULT_COMMAND_BURST): _BURST,
+                # Integration serving the lights (zha, zwave_js, hue...) -> limit
+                vol.Optional(CONF_COMMAND_RATES, default={}): {
+                    cv.string: {
+                        vol.Optional(CONF_COMMAND_RATE): _RATE,
+                        vol.Optional(CONF_COMMAND_BURST): _BURST,
+                    }
+                },
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Apply the integration wide command rate limits from configuration.yaml."""
+    if DOMAIN in config:
+        conf = config[DOMAIN]
+        _async_domain_data(hass)["batcher"].configure(
+            conf[CONF_COMMAND_RATE], conf[CONF_COMMAND_BURST], conf[CONF_COMMAND_RATES]
+        )
+    return True
 
 
 async def global_scheduler(hass: HomeAssistant):
-    """Global scheduler to iterate over all light instances."""
-    _LOGGER.info("Starting global light control scheduler")
-
-    while True:
-        global_toggle = hass.data[DOMAIN].get(CONF_GLOBAL_TOGGLE)
-        if global_toggle and not global_toggle.is_on:
-            _LOGGER.debug("Global toggle is OFF, skipping all light checks")
-            await asyncio.sleep(CHECK_INTERVAL)
-            continue
-        if DOMAIN in hass.data and "instances" in hass.data[DOMAIN]:
-            _LOGGER.debug("Checking %s timeouts...", DOMAIN)
-            for light_control in hass.data[DOMAIN]["instances"].values():
-                await light_control.check_timeout()
+    """Global scheduler waking only when a light timeout is due."""
+    await hass.data[DOMAIN]["scheduler"].async_run()
 
-        await asyncio.sleep(CHECK_INTERVAL)  # Run every X seconds
 
+def _async_domain_data(hass: HomeAssistant) -> dict:
+    """Create the shared domain state on first use."""
+    # The config flow may already have put the entity catalog here
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "instances" not in domain_data:
+        table = LightStateTable()
+        domain_data.update(
+            {
+                "instances": {},
+                "entries": {},  # entry_id -> light entities created by that entry
+                # entry_id -> light entities an unloaded entry had created
+                "unloaded": {},
+                "table": table,
+                "scheduler": TimeoutScheduler(hass, table),
+                "dispatcher": MotionDispatcher(hass),
+                "batcher": CommandBatcher(hass),
+                "illuminance": IlluminanceMonitor(hass),
+                "darkness": SunDarkness(hass),
+                "mirror": LightStateMirror(hass),
+                "adjacency": AdjacencyGraph(hass),
+                "concurrency": asyncio.Semaphore(MAX_CONCURRENT_LIGHTS),
+                "metrics": IntegrationMetrics(),
+                "store": LightStateStore(hass),
+                CONF_ZONES: ZoneManager(hass),
+                "profiler": HotPathProfiler(hass),
+                "scheduler_task": None,
+                # platform -> {entry_id: async_add_entities}, the first owns
+                # the domain wide entities
+                "platforms": {},
+            }
+        )
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up individual light controls and start the scheduler."""
+        @callback
+        def _async_stop(_event):
+            task = hass.data[DOMAIN]["scheduler_task"]
+            if task:
+                task.cancel()
+            hass.data[DOMAIN]["profiler"].async_shutdown()
 
-    if DOMAIN not in hass.data:
-        hass.data[DOMAIN] = {"instances": {}, "scheduler_task": None}
+        # A single stop listener for the whole domain
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
 
-    light_config = {**entry.data, **entry.options}
+        @callback
+        def _async_profile(call: ServiceCall):
+            hass.data[DOMAIN]["profiler"].async_start(
+                call.data["duration"], call.data["mode"]
+            )
 
-    # Avoid duplicate instances
-    if light_config[LIGHT_ENTYTY_INPUT_NAME] in hass.data[DOMAIN]["instances"]:
-        _LOGGER.error(
-            "Light %s is already configured.", light_config[LIGHT_ENTYTY_INPUT_NAME]
+        hass.services.async_register(
+            DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA
         )
+    return domain_data
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up the light controls of an entry and start the scheduler."""
+
+    domain_data = _async_domain_data(hass)
+    config = {**entry.data, **entry.options}
+    configs = light_configs(hass, config)
+    domain_data["unloaded"].pop(entry.entry_id, None)
+
+    # Avoid duplicate instances
+    if not is_bulk_config(config) and (
+        config[LIGHT_ENTYTY_INPUT_NAME] in domain_data["instances"]
+    ):
+        _LOGGER.error("Light %s is already configured.", config[LIGHT_ENTYTY_INPUT_NAME])
         return False
         # raise ValueError("Light entity already configured")
 
-    # Create instance per light
-    light_control = LightControl(hass, light_config)
-    await light_control.initialize()
-
-    hass.data[DOMAIN]["instances"][
-        light_config[LIGHT_ENTYTY_INPUT_NAME]
-    ] = light_control
+    await domain_data["store"].async_load()
+    domain_data["entries"][entry.entry_id] = []
+    await _async_apply_light_configs(hass, entry, configs)
+    _LOGGER.debug(
+        "Entry %s controls %s light(s)",
+        entry.title,
+        len(domain_data["entries"][entry.entry_id]),
+    )
 
     # Start global scheduler if not already running
-    if not hass.data[DOMAIN]["scheduler_task"]:
-        hass.data[DOMAIN]["scheduler_task"] = hass.loop.create_task(
-            global_scheduler(hass)
-        )
+    if not domain_data["scheduler_task"]:
+        domain_data["scheduler_task"] = hass.loop.create_task(global_scheduler(hass))
         _LOGGER.debug("Starting the scheduler as it seems to not be here.")
 
     async def _update_listener(hass, entry):
         cfg = {**entry.data, **entry.options}
-        light_control.motion_sensors = cfg.get(MOTION_SENSOR_INPUT_NAME, [])
-        light_control.auto_off_delay = cfg.get(AUTO_OFF_DELAY_INPUT_NAME, 0)
-        light_control.illuminance_sensor = cfg.get(ILLUMMINANCE_SENSOR_INPUT_NAME)
-        light_control.illuminance_threshold = cfg.get(
-            ILLUMINANCE_THRESHOLD_INPUT_NAME, 0
-        )
-        await light_control.initialize()
+        await _async_apply_light_configs(hass, entry, light_configs(hass, cfg))
 
     entry.async_on_unload(entry.add_update_listener(_update_listener))
 
-    hass.bus.async_listen_once(
-        "homeassistant_stop", lambda _: hass.data[DOMAIN]["scheduler_task"].cancel()
-    )
-
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
 
 
+async def _async_apply_light_configs(hass: HomeAssistant, entry, configs):
+    """Create, update and drop the light controls of an entry in one pass."""
+    instances = hass.data[DOMAIN]["instances"]
+    owned = hass.data[DOMAIN]["entries"][entry.entry_id]
+    wanted = {}
+    for cfg in configs:
+        light_entity = cfg[LIGHT_ENTYTY_INPUT_NAME]
+        if light_entity in instances and light_entity not in owned:
+            _LOGGER.error("Light %s is already configured.", light_entity)
+            continue
+        wanted[light_entity] = cfg
+
+    for light_entity in [light for light in owned if light not in wanted]:
+        _async_remove_light(hass, light_entity)
+        owned.remove(light_entity)
+
+    for light_entity, cfg in wanted.items():
+        light_control = instances.get(light_entity)
+        if light_control is None:
+            # Create instance per light
+            light_control = LightControl(hass, cfg)
+            instances[light_entity] = light_control
+            owned.append(light_entity)
+            hass.data[DOMAIN]["store"].restore(light_control)
+            await light_control.initialize()
+        else:
+            light_control.reconfigure(cfg)
+
+
+@callback
+def _async_remove_light(hass: HomeAssistant, light_entity: str):
+    """Release everything held for a light."""
+    _LOGGER.info("Unloading light control for %s", light_entity)
+    light_control = hass.data[DOMAIN]["instances"].pop(light_entity)
+    hass.data[DOMAIN]["store"].release(light_control)
+    light_control.teardown()
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload an individual light instance."""
+    """Unload the light instances and entities of an entry."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
 
-    light_config = {**entry.data, **entry.options}
-    light_entity = light_config[LIGHT_ENTYTY_INPUT_NAME]
+    owned = hass.data[DOMAIN]["entries"].pop(entry.entry_id, [])
+    for light_entity in owned:
+        _async_remove_light(hass, light_entity)
+    # Kept in case the entry is deleted next
+    hass.data[DOMAIN]["unloaded"][entry.entry_id] = owned
+    _async_hand_over_shared_entities(hass, entry)
 
-    if light_entity in hass.data[DOMAIN]["instances"]:
-        _LOGGER.info("Unloading light control for %s", light_entity)
-        del hass.data[DOMAIN]["instances"][light_entity]
+    # The config flows build the catalog again when they need it
+    if not hass.data[DOMAIN]["entries"]:
+        catalog = hass.data[DOMAIN].pop("catalog", None)
+        if catalog is not None:
+            catalog.async_shutdown()
 
     # Stop scheduler if no more instances left
     if not hass.data[DOMAIN]["instances"]:
@@ -115,3 +254,37 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             _LOGGER.info("Scheduler stopped as no lights are left.")
 
     return True
+
+
+@callback
+def _async_hand_over_shared_entities(hass: HomeAssistant, entry: ConfigEntry):
+    """Move the domain wide entities off an entry that is unloaded.
+
+    The first entry to set up a platform adds the global toggle, zone and
+    metrics entities; they go away with its platforms, so another loaded
+    entry adds them again.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from . import sensor, switch
+
+    for platform, module in ((Platform.SWITCH, switch), (Platform.SENSOR, sensor)):
+        adders = hass.data[DOMAIN]["platforms"].get(platform, {})
+        owner = next(iter(adders), None)
+        adders.pop(entry.entry_id, None)
+        if owner != entry.entry_id:
+            continue
+        module.async_drop_shared(hass)
+        if adders:
+            module.async_add_shared(hass, next(iter(adders.values())))
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop the saved state of the lights a deleted entry had created.
+
+    Lights it skipped because another entry controls them keep their state.
+    """
+    if "store" not in hass.data.get(DOMAIN, {}):
+        return
+    hass.data[DOMAIN]["store"].forget(
+        hass.data[DOMAIN]["unloaded"].pop(entry.entry_id, [])
+    )
@@ -0,0 +1,177 @@
+"""Auto-off delays learned from the pauses between motion events"""
+
+from bisect import bisect_right
+from itertools import accumulate
+
+from .const import (
+    ADAPTIVE_BUCKETS,
+    ADAPTIVE_MIN_SAMPLES,
+    ADAPTIVE_RETURN_SHARE,
+    ADAPTIVE_RETURN_WINDOW,
+)
+
+
+def _bin_edges() -> tuple:
+    """Upper edges in seconds of the pause bins, 25% apart from 10 seconds.
+
+    They reach past the longest delay the config flow accepts (300 minutes),
+    one more bin holds everything longer.
+    """
+    edges = [10.0]
+    while edges[-1] < 300 * 60 + ADAPTIVE_RETURN_WINDOW:
+        edges.append(edges[-1] * 1.25)
+    return tuple(edges)
+
+
+_EDGES = _bin_edges()
+# Marks a bucket whose delay has to be worked out again
+_STALE = object()
+
+
+class PauseHistogram:
+    """Counts of pauses in log spaced bins, a quantile sketch of fixed size.
+
+    Within a bin pauses are taken as evenly spread, so counts between any
+    two lengths can be interpolated.
+    """
+
+    __slots__ = ("counts", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(_EDGES) + 1)
+        self.count = 0
+
+    def add(self, seconds: float):
+        self.counts[bisect_right(_EDGES, seconds)] += 1
+        self.count += 1
+
+    def cumulative(self) -> list:
+        """Pauses below each bin, for shorter()."""
+        return list(accumulate(self.counts, initial=0))
+
+    def shorter(self, cumulative: list, seconds: float) -> float:
+        """Number of pauses shorter than seconds."""
+        index = bisect_right(_EDGES, seconds)
+        if index == len(_EDGES):
+            return cumulative[index]
+        low = _EDGES[index - 1] if index else 0.0
+        fraction = (seconds - low) / (_EDGES[index] - low)
+        return cumulative[index] + self.counts[index] * fraction
+
+    def quantile(self, q: float):
+        """Pause length below which a share q of the pauses fall."""
+        if not self.count:
+            return None
+        wanted = q * self.count
+        cumulative = self.cumulative()
+        index = min(bisect_right(cumulative, wanted), len(self.counts)) - 1
+        if index == len(_EDGES):
+            return _EDGES[-1]
+        low = _EDGES[index - 1] if index else 0.0
+        fraction = (wanted - cumulative[index]) / self.counts[index]
+        return low + (_EDGES[index] - low) * fraction
+
+    def as_state(self) -> list:
+        return list(self.counts)
+
+    def load(self, state: list):
+        self.counts = list(state)
+        self.count = sum(self.counts)
+
+
+class AdaptiveTimeout:
+    """Pauses between motion at one light, one histogram per time of day.
+
+    A pause runs from one motion event of the light's sensors to the next,
+    whether the light was on or not, so what is learned does not depend on
+    the delay in use. After a quiet time t the light is worth keeping on for
+    another ``ADAPTIVE_RETURN_WINDOW`` if motion came back within that window
+    in at least ``ADAPTIVE_RETURN_SHARE`` of the pauses that lasted t. People
+    sitting still keep coming back at a high rate; through traffic, and the
+    gaps between visits, return at their low background rate whenever the
+    light was left on, so their delay goes down to the minimum. Buckets with
+    too few pauses use the configured delay.
+    """
+
+    __slots__ = ("minimum", "maximum", "histograms", "_learned")
+
+    def __init__(self, minimum: float, maximum: float):
+        self.minimum = minimum  # seconds
+        self.maximum = maximum
+        self.histograms = [PauseHistogram() for _ in range(ADAPTIVE_BUCKETS)]
+        self._learned = [_STALE] * ADAPTIVE_BUCKETS  # seconds, None when unsure
+
+    @staticmethod
+    def bucket(hour: int) -> int:
+        return hour * ADAPTIVE_BUCKETS // 24
+
+    def rebound(self, minimum: float, maximum: float):
+        """Change the bounds, keeping the pauses seen so far."""
+        self.minimum, self.maximum = minimum, maximum
+        self._learned = [_STALE] * ADAPTIVE_BUCKETS
+
+    def observe(self, pause: float, hour: int):
+        bucket = self.bucket(hour)
+        self.histograms[bucket].add(pause)
+        self._learned[bucket] = _STALE
+
+    def timeout(self, hour: int, default: float) -> float:
+        """Auto-off delay in seconds for the bucket of an hour."""
+        return self._timeout(self.bucket(hour), default)
+
+    def _timeout(self, bucket: int, default: float) -> float:
+        learned = self._learned[bucket]
+        if learned is _STALE:
+            learned = self._learned[bucket] = self._learn(self.histograms[bucket])
+        if learned is None:
+            learned = default
+        return min(self.maximum, max(self.minimum, learned))
+
+    def _learn(self, histogram: PauseHistogram):
+        """Latest quiet time motion still often came back after, plus the window."""
+        if histogram.count < ADAPTIVE_MIN_SAMPLES:
+            return None
+        cumulative = histogram.cumulative()
+        learned = 0.0
+        for quiet in (0.0, *_EDGES):
+            if quiet >= self.maximum:
+                break
+            shorter = histogram.shorter(cumulative, quiet)
+            longer = histogram.count - shorter
+            if longer < ADAPTIVE_MIN_SAMPLES:
+                # Too few pauses this long to tell
+                break
+            returned = (
+                histogram.shorter(cumulative, quiet + ADAPTIVE_RETURN_WINDOW) - shorter
+            )
+            if returned >= ADAPTIVE_RETURN_SHARE * longer:
+                learned = quiet + ADAPTIVE_RETURN_WINDOW
+        return learned
+
+    def as_dict(self, default: float) -> list:
+        """Learned values per bucket, for the diagnostics."""
+        hours = 24 // ADAPTIVE_BUCKETS
+        return [
+            {
+                "hours": f"{index * hours:02d}-{(index + 1) * hours:02d}",
+                "pauses": histogram.count,
+                "pause_median_seconds": histogram.quantile(0.5),
+                "pause_p90_seconds": histogram.quantile(0.9),
+                "auto_off_seconds": self._timeout(index, default),
+            }
+            for index, histogram in enumerate(self.histograms)
+        ]
+
+    def as_state(self) -> list:
+        return [histogram.as_state() for histogram in self.histograms]
+
+    def load(self, state: list):
+        """Restore saved histograms, ignoring them if the bins changed."""
+        if len(state) != len(self.histograms) or any(
+            not isinstance(counts, list) or len(counts) != len(_EDGES) + 1
+            for counts in state
+        ):
+            return
+        for histogram, counts in zip(self.histograms, state):
+            histogram.load(counts)
+        self._learned = [_STALE] * ADAPTIVE_BUCKETS
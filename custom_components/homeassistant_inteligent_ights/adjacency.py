@@ -0,0 +1,59 @@
+"""Lights switched on ahead of need when there is motion next door"""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AdjacencyGraph:
+    """Precomputed neighbours of every light.
+
+    Edges point from a light to the lights people usually reach next, e.g.
+    hallway -> stairs -> landing, so a motion event only visits the lights
+    it points to. Neighbours that are not controlled (yet) are kept and
+    picked up once they are. Only real motion spreads, a light switched
+    on ahead of need does not warm up its own neighbours.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._neighbours: dict = {}  # light_entity -> tuple of light entities
+
+    @callback
+    def register(self, light_control):
+        """(Re)build the edges leaving a light."""
+        neighbours = tuple(
+            light
+            for light in dict.fromkeys(light_control.adjacent_lights)
+            if light != light_control.light_entity
+        )
+        if neighbours:
+            self._neighbours[light_control.light_entity] = neighbours
+        else:
+            self._neighbours.pop(light_control.light_entity, None)
+
+    @callback
+    def unregister(self, light_control):
+        self._neighbours.pop(light_control.light_entity, None)
+
+    @callback
+    def pre_activate(self, light_entity: str):
+        """Give the lights next to one that saw motion a head start."""
+        neighbours = self._neighbours.get(light_entity)
+        if not neighbours:
+            return
+        instances = self.hass.data[DOMAIN]["instances"]
+        for neighbour in neighbours:
+            light_control = instances.get(neighbour)
+            if light_control is not None and light_control.enabled:
+                light_control.anticipate()
+
+    def diagnostics(self) -> dict:
+        return {
+            "lights": len(self._neighbours),
+            "edges": sum(len(neighbours) for neighbours in self._neighbours.values()),
+        }
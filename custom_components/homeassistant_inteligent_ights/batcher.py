@@ -0,0 +1,278 @@
+"""Coalesce light on/off commands into as few service calls as possible"""
+
+import logging
+from collections import deque
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+
+from .const import (
+    DOMAIN,
+    COMMAND_BATCH_WINDOW,
+    COMMAND_PRIORITIES,
+    CONF_COMMAND_RATE,
+    CONF_COMMAND_BURST,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_COMMAND_BURST,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Rate limit of the lights the entity registry does not know
+DEFAULT_LANE = "default"
+# Priority of services missing from COMMAND_PRIORITIES
+_LOWEST_PRIORITY = max(COMMAND_PRIORITIES.values()) + 1
+
+
+class TokenBucket:
+    """Allows ``rate`` commands per second on average, ``burst`` at once."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = now
+
+    def take(self, wanted: int, now: float) -> int:
+        """Take up to wanted tokens, returning how many were granted."""
+        if not self.rate:
+            # Not paced, e.g. reconfigured to 0 while groups were waiting
+            return wanted
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        granted = min(wanted, int(self.tokens + 1e-9))
+        self.tokens -= granted
+        return granted
+
+    def wait(self) -> float:
+        """Seconds until the next token is available."""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Batch:
+    """Lights waiting for tokens to be sent one service in one call."""
+
+    __slots__ = ("key", "group", "queued_at")
+
+    def __init__(self, key, group: dict, queued_at: float):
+        self.key = key  # (service, frozen service data)
+        self.group = group  # entity_id -> [futures]
+        self.queued_at = queued_at
+
+
+class _Lane:
+    """Token bucket of one integration and its queues, one per priority."""
+
+    __slots__ = ("bucket", "queues", "handle")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.queues = [deque() for _ in range(_LOWEST_PRIORITY + 1)]
+        self.handle = None
+
+
+class CommandBatcher:
+    """Collects light commands for a short window and sends them grouped.
+
+    Commands are grouped by service and identical service data so one
+    ``light.turn_on``/``light.turn_off`` call carries a list of entity ids.
+    Every caller gets the outcome of the call its light was part of, or
+    None when a newer command for its light took its place before sending.
+
+    Each integration serving lights (a Zigbee or Z-Wave mesh, a bridge) gets
+    a token bucket paced in lights per second. Groups that find it empty
+    wait in priority queues, so a turn-on for someone walking in overtakes
+    a burst of timeout turn-offs. Integrations with a rate of 0 get their
+    groups sent at once.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        window: float = COMMAND_BATCH_WINDOW,
+        rate: float = DEFAULT_COMMAND_RATE,
+        burst: int = DEFAULT_COMMAND_BURST,
+    ):
+        self.hass = hass
+        self.window = window
+        # (service, frozen service data) -> {entity_id: [futures]}
+        self._pending: dict = {}
+        self._queued: dict = {}  # entity_id -> group key it is queued in
+        self._flush_handle = None
+        self._waiting: dict = {}  # entity_id -> _Batch waiting for tokens
+        self._lanes: dict = {}  # integration -> _Lane
+        self._lane_of: dict = {}  # entity_id -> integration
+        self.configure(rate, burst)
+
+    @callback
+    def configure(self, rate: float, burst: int, overrides: dict | None = None):
+        """Set the default rate limit and the overrides per integration."""
+        self.rate = rate
+        self.burst = burst
+        self._overrides = overrides or {}
+        # Nothing paced, no need to look up the integration of each light
+        self._unlimited = not rate and not any(
+            override.get(CONF_COMMAND_RATE) for override in self._overrides.values()
+        )
+        for name, lane in self._lanes.items():
+            lane.bucket = self._new_bucket(name)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of lights waiting for tokens."""
+        return len(self._waiting)
+
+    async def async_call(
+        self, service: str, entity_id: str, **service_data
+    ) -> bool | None:
+        """Queue a command for a light and wait until it was sent."""
+        key = (service, tuple(sorted(service_data.items())))
+
+        batch = self._waiting.get(entity_id)
+        if batch is not None:
+            if batch.key == key:
+                # Same command already waiting for tokens, share its outcome
+                future = self.hass.loop.create_future()
+                batch.group[entity_id].append(future)
+                return await future
+            # A newer intent for the same light supersedes the waiting one
+            del self._waiting[entity_id]
+            for future in batch.group.pop(entity_id):
+                future.set_result(None)
+
+        previous = self._queued.get(entity_id)
+        if previous is not None and previous != key:
+            # A newer intent for the same light supersedes the queued one
+            for future in self._pending[previous].pop(entity_id):
+                future.set_result(None)
+            if not self._pending[previous]:
+                del self._pending[previous]
+
+        future = self.hass.loop.create_future()
+        self._pending.setdefault(key, {}).setdefault(entity_id, []).append(future)
+        self._queued[entity_id] = key
+
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_later(self.window, self._flush)
+        return await future
+
+    @callback
+    def _flush(self):
+        """Send one service call per group collected in this window."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        self._queued = {}
+        if self._unlimited:
+            for key in sorted(pending, key=_priority):
+                self._send(key, pending[key])
+            return
+
+        now = self.hass.loop.time()
+        lanes = set()
+        for key in sorted(pending, key=_priority):
+            by_lane: dict = {}
+            for entity_id, futures in pending[key].items():
+                by_lane.setdefault(self._lane_name(entity_id), {})[entity_id] = futures
+            unpaced: dict = {}
+            for name, lane_group in by_lane.items():
+                lane = self._lane(name)
+                if not lane.bucket.rate:
+                    unpaced.update(lane_group)
+                    continue
+                batch = _Batch(key, lane_group, now)
+                lane.queues[_priority(key)].append(batch)
+                for entity_id in lane_group:
+                    self._waiting[entity_id] = batch
+                lanes.add(name)
+            if unpaced:
+                self._send(key, unpaced)
+        for name in lanes:
+            self._drain(self._lanes[name])
+
+    @callback
+    def _drain(self, lane: _Lane):
+        """Send waiting groups in priority order while the bucket has tokens."""
+        if lane.handle is not None:
+            lane.handle.cancel()
+            lane.handle = None
+        now = self.hass.loop.time()
+        metrics = self.hass.data[DOMAIN]["metrics"]
+        for queue in lane.queues:
+            while queue:
+                batch = queue[0]
+                if not batch.group:
+                    # Every light of it was superseded
+                    queue.popleft()
+                    continue
+                granted = lane.bucket.take(len(batch.group), now)
+                if not granted:
+                    lane.handle = self.hass.loop.call_later(
+                        lane.bucket.wait(), self._drain, lane
+                    )
+                    metrics.command_queue(len(self._waiting))
+                    return
+                if granted < len(batch.group):
+                    group = {
+                        entity_id: batch.group.pop(entity_id)
+                        for entity_id in list(batch.group)[:granted]
+                    }
+                else:
+                    group = batch.group
+                    queue.popleft()
+                for entity_id in group:
+                    del self._waiting[entity_id]
+                metrics.command_waited(batch.key[0], now - batch.queued_at)
+                self._send(batch.key, group)
+        metrics.command_queue(len(self._waiting))
+
+    @callback
+    def _send(self, key, group: dict):
+        service, service_data = key
+        self.hass.async_create_task(self._async_send(service, dict(service_data), group))
+
+    def _lane_name(self, entity_id: str) -> str:
+        """Integration serving a light, resolved once per light."""
+        name = self._lane_of.get(entity_id)
+        if name is None:
+            entry = er.async_get(self.hass).async_get(entity_id)
+            name = entry.platform if entry is not None else DEFAULT_LANE
+            self._lane_of[entity_id] = name
+        return name
+
+    def _lane(self, name: str) -> _Lane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = self._lanes[name] = _Lane(self._new_bucket(name))
+        return lane
+
+    def _new_bucket(self, name: str) -> TokenBucket:
+        override = self._overrides.get(name, {})
+        return TokenBucket(
+            override.get(CONF_COMMAND_RATE, self.rate),
+            override.get(CONF_COMMAND_BURST, self.burst),
+            self.hass.loop.time(),
+        )
+
+    async def _async_send(self, service: str, service_data: dict, group: dict):
+        entity_ids = list(group)
+        _LOGGER.debug("Calling light.%s for %s", service, entity_ids)
+        self.hass.data[DOMAIN]["metrics"].service_call(service, len(entity_ids))
+        try:
+            await self.hass.services.async_call(
+                "light", service, {**service_data, "entity_id": entity_ids}
+            )
+            success = True
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("light.%s failed for %s", service, entity_ids)
+            success = False
+
+        for futures in group.values():
+            for future in futures:
+                if not future.done():
+                    future.set_result(success)
+
+
+def _priority(key) -> int:
+    return COMMAND_PRIORITIES.get(key[0], _LOWEST_PRIORITY)
@@ -0,0 +1,181 @@
+"""Expand bulk config entries (areas, floors, imports) into per-light configs"""
+
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+import yaml
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+
+from .catalog import entity_device_class
+from .const import (
+    LIGHT_ENTYTY_INPUT_NAME,
+    MOTION_SENSOR_INPUT_NAME,
+    ILLUMMINANCE_SENSOR_INPUT_NAME,
+    ILLUMINANCE_THRESHOLD_INPUT_NAME,
+    ILLUMINANCE_HYSTERESIS_INPUT_NAME,
+    AUTO_OFF_DELAY_INPUT_NAME,
+    MOTION_DEBOUNCE_INPUT_NAME,
+    DARKNESS_MODE_INPUT_NAME,
+    DARKNESS_MODES,
+    ADJACENT_LIGHTS_INPUT_NAME,
+    ADAPTIVE_AUTO_OFF_INPUT_NAME,
+    AUTO_OFF_MIN_INPUT_NAME,
+    AUTO_OFF_MAX_INPUT_NAME,
+    CONF_LIGHTS,
+    CONF_AREAS,
+    CONF_FLOORS,
+    AREA_MOTION_DEVICE_CLASSES,
+    ILLUMINANCE_DEVICE_CLASS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Options shared by every light of a bulk entry unless a light overrides them
+DEFAULT_KEYS = (
+    AUTO_OFF_DELAY_INPUT_NAME,
+    MOTION_DEBOUNCE_INPUT_NAME,
+    ILLUMMINANCE_SENSOR_INPUT_NAME,
+    ILLUMINANCE_THRESHOLD_INPUT_NAME,
+    ILLUMINANCE_HYSTERESIS_INPUT_NAME,
+    DARKNESS_MODE_INPUT_NAME,
+    ADAPTIVE_AUTO_OFF_INPUT_NAME,
+    AUTO_OFF_MIN_INPUT_NAME,
+    AUTO_OFF_MAX_INPUT_NAME,
+)
+
+LIGHT_SCHEMA = vol.Schema(
+    {
+        vol.Required(LIGHT_ENTYTY_INPUT_NAME): str,
+        vol.Optional(MOTION_SENSOR_INPUT_NAME, default=[]): vol.Any(
+            [str], vol.All(str, lambda value: [value])
+        ),
+        vol.Optional(AUTO_OFF_DELAY_INPUT_NAME): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=300)
+        ),
+        vol.Optional(MOTION_DEBOUNCE_INPUT_NAME): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=60)
+        ),
+        vol.Optional(ILLUMMINANCE_SENSOR_INPUT_NAME): vol.Any(str, None),
+        vol.Optional(ILLUMINANCE_THRESHOLD_INPUT_NAME): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=1000)
+        ),
+        vol.Optional(ILLUMINANCE_HYSTERESIS_INPUT_NAME): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=1000)
+        ),
+        vol.Optional(DARKNESS_MODE_INPUT_NAME): vol.In(DARKNESS_MODES),
+        vol.Optional(ADAPTIVE_AUTO_OFF_INPUT_NAME): bool,
+        vol.Optional(AUTO_OFF_MIN_INPUT_NAME): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=300)
+        ),
+        vol.Optional(AUTO_OFF_MAX_INPUT_NAME): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=300)
+        ),
+        vol.Optional(ADJACENT_LIGHTS_INPUT_NAME): vol.Any(
+            [str], vol.All(str, lambda value: [value])
+        ),
+    },
+    extra=vol.PREVENT_EXTRA,
+)
+
+
+def parse_lights_import(text: str) -> list[dict]:
+    """Parse a YAML or JSON list of light configs, raising ValueError."""
+    try:
+        lights = yaml.safe_load(text)
+    except yaml.YAMLError as err:
+        raise ValueError(f"Invalid YAML/JSON: {err}") from err
+    if isinstance(lights, dict) and CONF_LIGHTS in lights:
+        lights = lights[CONF_LIGHTS]
+    if not isinstance(lights, list) or not lights:
+        raise ValueError("Expected a non empty list of lights")
+    try:
+        lights = [LIGHT_SCHEMA(light) for light in lights]
+    except vol.Invalid as err:
+        raise ValueError(str(err)) from err
+
+    seen = set()
+    for light in lights:
+        if light[LIGHT_ENTYTY_INPUT_NAME] in seen:
+            raise ValueError(f"Light {light[LIGHT_ENTYTY_INPUT_NAME]} listed twice")
+        seen.add(light[LIGHT_ENTYTY_INPUT_NAME])
+    return lights
+
+
+def is_bulk_config(config: dict) -> bool:
+    """Whether an entry describes many lights instead of a single one."""
+    return any(key in config for key in (CONF_LIGHTS, CONF_AREAS, CONF_FLOORS))
+
+
+def light_configs(hass: HomeAssistant, config: dict) -> list[dict]:
+    """Expand an entry config into one config per controlled light."""
+    if not is_bulk_config(config):
+        return [config]
+
+    defaults = {key: config[key] for key in DEFAULT_KEYS if key in config}
+    if CONF_LIGHTS in config:
+        return [{**defaults, **light} for light in config[CONF_LIGHTS]]
+    return [
+        {**defaults, **light}
+        for light in _area_light_configs(
+            hass, config.get(CONF_AREAS, []), config.get(CONF_FLOORS, [])
+        )
+    ]
+
+
+def _area_light_configs(hass: HomeAssistant, areas, floors) -> list[dict]:
+    """Lights of the given areas/floors with the motion sensors next to them."""
+    area_reg = ar.async_get(hass)
+    area_ids = set(areas)
+    for floor_id in floors:
+        # Areas have no floor before Home Assistant 2024.3
+        area_ids.update(
+            area.id
+            for area in area_reg.async_list_areas()
+            if getattr(area, "floor_id", None) == floor_id
+        )
+
+    ent_reg = er.async_get(hass)
+    dev_reg = dr.async_get(hass)
+    configs = []
+    for area_id in sorted(area_ids):
+        lights, motion_sensors, illuminance_sensors = [], [], []
+        for entry in _area_entities(ent_reg, dev_reg, area_id):
+            if entry.disabled_by is not None:
+                continue
+            device_class = entity_device_class(hass, entry.entity_id, entry)
+            if entry.domain == "light":
+                lights.append(entry.entity_id)
+            elif (
+                entry.domain == "binary_sensor"
+                and device_class in AREA_MOTION_DEVICE_CLASSES
+            ):
+                motion_sensors.append(entry.entity_id)
+            elif entry.domain == "sensor" and device_class == ILLUMINANCE_DEVICE_CLASS:
+                illuminance_sensors.append(entry.entity_id)
+
+        if lights and not motion_sensors:
+            _LOGGER.warning("Area %s has lights but no motion sensors", area_id)
+        for light in sorted(lights):
+            config = {
+                LIGHT_ENTYTY_INPUT_NAME: light,
+                MOTION_SENSOR_INPUT_NAME: sorted(motion_sensors),
+            }
+            if illuminance_sensors:
+                config[ILLUMMINANCE_SENSOR_INPUT_NAME] = sorted(illuminance_sensors)[0]
+            configs.append(config)
+    return configs
+
+
+def _area_entities(ent_reg, dev_reg, area_id):
+    """Entities assigned to an area directly or through their device."""
+    yield from er.async_entries_for_area(ent_reg, area_id)
+    for device in dr.async_entries_for_area(dev_reg, area_id):
+        for entry in er.async_entries_for_device(ent_reg, device.id):
+            # Entities with their own area were handled above
+            if entry.area_id is None:
+                yield entry
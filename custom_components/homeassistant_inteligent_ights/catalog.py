@@ -0,0 +1,141 @@
+"""Domain wide catalog of the entities offered by the config flows"""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import (
+    async_track_state_added_domain,
+    async_track_state_removed_domain,
+)
+
+from .const import DOMAIN, MOTION_DEVICE_CLASSES, ILLUMINANCE_DEVICE_CLASS
+
+_LOGGER = logging.getLogger(__name__)
+
+CATALOG_DOMAINS = ("light", "binary_sensor", "sensor")
+
+
+@callback
+def async_get_catalog(hass: HomeAssistant) -> "EntityCatalog":
+    """Return the shared catalog, building it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "catalog" not in domain_data:
+        domain_data["catalog"] = EntityCatalog(hass)
+    return domain_data["catalog"]
+
+
+@callback
+def entity_device_class(hass: HomeAssistant, entity_id: str, entry=None):
+    """Device class of an entity from its registry entry, falling back to its state."""
+    device_class = None
+    if entry is not None:
+        device_class = entry.device_class or entry.original_device_class
+    if device_class is None and (state := hass.states.get(entity_id)):
+        device_class = state.attributes.get("device_class")
+    return device_class
+
+
+class EntityCatalog:
+    """Candidate lights, motion sensors and illuminance sensors.
+
+    Built with a single pass over the state machine, then kept current from
+    state added/removed and entity registry events, so opening a form only
+    reads ready made sorted lists.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._sets = {"lights": set(), "motion_sensors": set(), "illuminance_sensors": set()}
+        self._sorted: dict = {}  # name -> sorted list, dropped when the set changes
+
+        for state in hass.states.async_all(CATALOG_DOMAINS):
+            self._add(state.entity_id, state.attributes.get("device_class"))
+        _LOGGER.debug(
+            "Entity catalog built: %s",
+            {name: len(entities) for name, entities in self._sets.items()},
+        )
+
+        self._unsubs = [
+            async_track_state_added_domain(hass, CATALOG_DOMAINS, self._handle_added),
+            async_track_state_removed_domain(
+                hass, CATALOG_DOMAINS, self._handle_removed
+            ),
+            hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._handle_registry_updated
+            ),
+        ]
+
+    @property
+    def lights(self) -> list:
+        return self._get("lights")
+
+    @property
+    def motion_sensors(self) -> list:
+        return self._get("motion_sensors")
+
+    @property
+    def illuminance_sensors(self) -> list:
+        return self._get("illuminance_sensors")
+
+    @callback
+    def async_shutdown(self):
+        """Stop following entity changes."""
+        while self._unsubs:
+            self._unsubs.pop()()
+
+    def _get(self, name) -> list:
+        if name not in self._sorted:
+            self._sorted[name] = sorted(self._sets[name])
+        return self._sorted[name]
+
+    @staticmethod
+    def _category(entity_id, device_class):
+        domain = entity_id.split(".", 1)[0]
+        if domain == "light":
+            return "lights"
+        if domain == "binary_sensor" and device_class in MOTION_DEVICE_CLASSES:
+            return "motion_sensors"
+        if domain == "sensor" and device_class == ILLUMINANCE_DEVICE_CLASS:
+            return "illuminance_sensors"
+        return None
+
+    @callback
+    def _add(self, entity_id, device_class):
+        name = self._category(entity_id, device_class)
+        if name is not None and entity_id not in self._sets[name]:
+            self._sets[name].add(entity_id)
+            self._sorted.pop(name, None)
+
+    @callback
+    def _remove(self, entity_id):
+        for name, entities in self._sets.items():
+            if entity_id in entities:
+                entities.discard(entity_id)
+                self._sorted.pop(name, None)
+
+    @callback
+    def _handle_added(self, event):
+        new_state = event.data["new_state"]
+        self._add(new_state.entity_id, new_state.attributes.get("device_class"))
+
+    @callback
+    def _handle_removed(self, event):
+        self._remove(event.data["entity_id"])
+
+    @callback
+    def _handle_registry_updated(self, event):
+        """Follow renames and device class overrides of registry entries."""
+        data = event.data
+        if data["action"] != "update":
+            # Creations and removals show up as state added/removed events
+            return
+        entity_id = data["entity_id"]
+        if entity_id.split(".", 1)[0] not in CATALOG_DOMAINS:
+            return
+        self._remove(data.get("old_entity_id", entity_id))
+        self._remove(entity_id)
+        if self.hass.states.get(entity_id) is None:
+            return
+        entry = er.async_get(self.hass).async_get(entity_id)
+        self._add(entity_id, entity_device_class(self.hass, entity_id, entry))
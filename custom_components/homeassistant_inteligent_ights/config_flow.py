@@ -16,41 +16,53 @@ from .const import (
     MOTION_SENSOR_INPUT_NAME,
     ILLUMMINANCE_SENSOR_INPUT_NAME,
     ILLUMINANCE_THRESHOLD_INPUT_NAME,
+    ILLUMINANCE_HYSTERESIS_INPUT_NAME,
     AUTO_OFF_DELAY_INPUT_NAME,
+    MOTION_DEBOUNCE_INPUT_NAME,
+    DEFAULT_MOTION_DEBOUNCE,
+    DARKNESS_MODE_INPUT_NAME,
+    DARKNESS_MODES,
+    DEFAULT_DARKNESS_MODE,
+    ADJACENT_LIGHTS_INPUT_NAME,
+    ADAPTIVE_AUTO_OFF_INPUT_NAME,
+    AUTO_OFF_MIN_INPUT_NAME,
+    AUTO_OFF_MAX_INPUT_NAME,
+    DEFAULT_AUTO_OFF_MIN,
+    DEFAULT_AUTO_OFF_MAX,
+    CONF_LIGHTS,
+    CONF_AREAS,
+    CONF_FLOORS,
+    CONF_LIGHTS_IMPORT,
 )
+from .bulk import is_bulk_config, parse_lights_import
+from .catalog import async_get_catalog
 
 _LOGGER = logging.getLogger(__name__)
 
+_DARKNESS_MODE_SELECTOR = selector.SelectSelector(
+    selector.SelectSelectorConfig(
+        options=list(DARKNESS_MODES), mode=selector.SelectSelectorMode.DROPDOWN
+    )
+)
+
+# Bounds of a learned auto-off delay, in minutes
+_AUTO_OFF_BOUND = vol.All(vol.Coerce(float), vol.Range(min=0.1, max=300))
+
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Hello World."""
 
-    def __init__(self):
-        super().__init__()  # Ensure propper iniitialisation
-        self.lights = []
-        self.motion_sensors = []
-        self.illuminance_sensors = []
-
     async def async_step_user(self, user_input=None):
-        """Handle the initial step of the config flow."""
-        # Fetch all light and motion sensor entities
+        """Let the user pick between a single light and a bulk setup."""
+        return self.async_show_menu(
+            step_id="user", menu_options=["light", "area", CONF_LIGHTS_IMPORT]
+        )
+
+    async def async_step_light(self, user_input=None):
+        """Configure a single light."""
         errors = {}
 
-        if not self.lights or not self.motion_sensors or not self.illuminance_sensors:
-            self.lights = [
-                state.entity_id for state in self.hass.states.async_all("light")
-            ]
-            self.motion_sensors = [
-                state.entity_id
-                for state in self.hass.states.async_all("binary_sensor")
-                if state.attributes.get("device_class")
-                in ("motion", "occupancy", "door", "window", "tamper")
-            ]
-            self.illuminance_sensors = [
-                state.entity_id
-                for state in self.hass.states.async_all("sensor")
-                if state.attributes.get("device_class") == "illuminance"
-            ]
+        catalog = async_get_catalog(self.hass)
 
         if user_input is not None:
             # Handle saving the configuration
@@ -66,6 +78,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         f"Light {user_input['light_entity']} already configured"
                     )
 
+                _check_adaptive_bounds(user_input)
                 data = {
                     CONF_NAME: user_input[CONF_NAME],
                     LIGHT_ENTYTY_INPUT_NAME: user_input[LIGHT_ENTYTY_INPUT_NAME],
@@ -78,12 +91,25 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     AUTO_OFF_DELAY_INPUT_NAME: user_input.get(
                         AUTO_OFF_DELAY_INPUT_NAME, 0
                     ),
+                    MOTION_DEBOUNCE_INPUT_NAME: user_input.get(
+                        MOTION_DEBOUNCE_INPUT_NAME, DEFAULT_MOTION_DEBOUNCE
+                    ),
                     ILLUMMINANCE_SENSOR_INPUT_NAME: user_input.get(
                         ILLUMMINANCE_SENSOR_INPUT_NAME
                     ),
                     ILLUMINANCE_THRESHOLD_INPUT_NAME: user_input.get(
                         ILLUMINANCE_THRESHOLD_INPUT_NAME, 0
                     ),
+                    ILLUMINANCE_HYSTERESIS_INPUT_NAME: user_input.get(
+                        ILLUMINANCE_HYSTERESIS_INPUT_NAME, 0
+                    ),
+                    DARKNESS_MODE_INPUT_NAME: user_input.get(
+                        DARKNESS_MODE_INPUT_NAME, DEFAULT_DARKNESS_MODE
+                    ),
+                    ADJACENT_LIGHTS_INPUT_NAME: user_input.get(
+                        ADJACENT_LIGHTS_INPUT_NAME, []
+                    ),
+                    **_adaptive_options(user_input),
                 }
 
                 return self.async_create_entry(
@@ -99,31 +125,127 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["base"] = f"Error: {e}"
 
         return self.async_show_form(
-            step_id="user",
+            step_id="light",
             data_schema=vol.Schema(
                 {
                     vol.Required(CONF_NAME): str,
                     vol.Required(LIGHT_ENTYTY_INPUT_NAME): selector.SelectSelector(
-                        selector.SelectSelectorConfig(options=self.lights)
+                        selector.SelectSelectorConfig(options=catalog.lights)
                     ),
                     vol.Optional(MOTION_SENSOR_INPUT_NAME): selector.SelectSelector(
                         selector.SelectSelectorConfig(
-                            options=self.motion_sensors, multiple=True
+                            options=catalog.motion_sensors, multiple=True
                         )
                     ),
                     vol.Required(AUTO_OFF_DELAY_INPUT_NAME, default=0): vol.All(
                         vol.Coerce(float), vol.Range(min=0, max=300)
                     ),
+                    vol.Required(
+                        MOTION_DEBOUNCE_INPUT_NAME, default=DEFAULT_MOTION_DEBOUNCE
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
                     vol.Optional(
                         ILLUMMINANCE_SENSOR_INPUT_NAME
                     ): selector.SelectSelector(
                         selector.SelectSelectorConfig(
-                            options=self.illuminance_sensors, custom_value=True
+                            options=catalog.illuminance_sensors, custom_value=True
                         )
                     ),
                     vol.Required(ILLUMINANCE_THRESHOLD_INPUT_NAME, default=0): vol.All(
                         int, vol.Range(min=0, max=1000)
                     ),
+                    vol.Required(ILLUMINANCE_HYSTERESIS_INPUT_NAME, default=0): vol.All(
+                        int, vol.Range(min=0, max=1000)
+                    ),
+                    vol.Required(
+                        DARKNESS_MODE_INPUT_NAME, default=DEFAULT_DARKNESS_MODE
+                    ): _DARKNESS_MODE_SELECTOR,
+                    vol.Optional(ADJACENT_LIGHTS_INPUT_NAME): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=catalog.lights, multiple=True
+                        )
+                    ),
+                    **_adaptive_schema({}),
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_area(self, user_input=None):
+        """Configure every light of some areas or floors at once."""
+        errors = {}
+
+        if user_input is not None:
+            if not user_input.get(CONF_AREAS) and not user_input.get(CONF_FLOORS):
+                errors["base"] = "Error: Select at least one area or floor"
+            else:
+                try:
+                    _check_adaptive_bounds(user_input)
+                    data = {
+                        CONF_NAME: user_input[CONF_NAME],
+                        CONF_AREAS: user_input.get(CONF_AREAS, []),
+                        CONF_FLOORS: user_input.get(CONF_FLOORS, []),
+                    }
+                    return self.async_create_entry(
+                        title=user_input[CONF_NAME],
+                        data=data,
+                        options=_bulk_defaults(user_input),
+                    )
+                except ValueError as e:
+                    errors["base"] = f"Error: {e}"
+
+        schema = {
+            vol.Required(CONF_NAME): str,
+            vol.Optional(CONF_AREAS): selector.AreaSelector(
+                selector.AreaSelectorConfig(multiple=True)
+            ),
+        }
+        # Floors only exist on Home Assistant 2024.4 and later
+        floor_selector = getattr(selector, "FloorSelector", None)
+        if floor_selector is not None:
+            schema[vol.Optional(CONF_FLOORS)] = floor_selector(
+                selector.FloorSelectorConfig(multiple=True)
+            )
+        schema.update(_bulk_defaults_schema({}))
+
+        return self.async_show_form(
+            step_id="area", data_schema=vol.Schema(schema), errors=errors
+        )
+
+    async def async_step_lights_import(self, user_input=None):
+        """Configure many lights from a pasted YAML/JSON list."""
+        errors = {}
+
+        if user_input is not None:
+            try:
+                _check_adaptive_bounds(user_input)
+                lights = parse_lights_import(user_input[CONF_LIGHTS_IMPORT])
+                configured = self.hass.data.get(DOMAIN, {}).get("instances", {})
+                duplicates = [
+                    light[LIGHT_ENTYTY_INPUT_NAME]
+                    for light in lights
+                    if light[LIGHT_ENTYTY_INPUT_NAME] in configured
+                ]
+                if duplicates:
+                    raise ValueError(
+                        f"Lights already configured: {', '.join(duplicates)}"
+                    )
+                return self.async_create_entry(
+                    title=user_input[CONF_NAME],
+                    data={CONF_NAME: user_input[CONF_NAME], CONF_LIGHTS: lights},
+                    options=_bulk_defaults(user_input),
+                )
+            except ValueError as e:
+                errors["base"] = f"Error: {e}"
+
+        return self.async_show_form(
+            step_id=CONF_LIGHTS_IMPORT,
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_NAME): str,
+                    vol.Required(CONF_LIGHTS_IMPORT): selector.TextSelector(
+                        selector.TextSelectorConfig(multiline=True)
+                    ),
+                    **_bulk_defaults_schema({}),
                 }
             ),
             errors=errors,
@@ -142,50 +264,28 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         super().__init__()  # Ensure propper iniitialisation
         _LOGGER.debug(
             "Saving config for %s <-> %s",
-            config_entry.data[LIGHT_ENTYTY_INPUT_NAME],
-            config_entry.data[LIGHT_ENTYTY_INPUT_NAME],
+            config_entry.title,
+            config_entry.data.get(LIGHT_ENTYTY_INPUT_NAME),
         )
         # self._config_entry = config_entry # Remove as is deprecated
         self.hass: HomeAssistant = None  # still can use self.hass
 
     async def async_step_init(self, user_input=None):
         """Manage options for an existing light entry."""
-        if user_input is not None:
-            light_entity = self.config_entry.data[LIGHT_ENTYTY_INPUT_NAME]
-            #light_control = self.hass.data[DOMAIN]["instances"].get(light_entity)
-            light_control = self.hass.data.get(DOMAIN, {}).get("instances", {}).get(light_entity)
-
-            if light_control:
-                # Update motion sensors
-                if MOTION_SENSOR_INPUT_NAME in user_input:
-                    new_motion_sensors = user_input.get(MOTION_SENSOR_INPUT_NAME, [])
-                    if isinstance(new_motion_sensors, str):
-                        new_motion_sensors = [new_motion_sensors]
-                    light_control.motion_sensors = new_motion_sensors
-
-                # Update auto-off and threshold
-                light_control.auto_off_delay = user_input.get(
-                    AUTO_OFF_DELAY_INPUT_NAME, 0
-                )
-
-                if ILLUMMINANCE_SENSOR_INPUT_NAME in user_input:
-                    light_control.illuminance_sensor = user_input.get(
-                        ILLUMMINANCE_SENSOR_INPUT_NAME
-                    )
-
-                
-                light_control.illuminance_threshold = user_input.get(
-                    ILLUMINANCE_THRESHOLD_INPUT_NAME, 0
-                )
-
-                # Re-initialize motion tracking if necessary
-                await light_control.initialize()
+        if is_bulk_config(self.config_entry.data):
+            return await self.async_step_bulk(user_input)
 
-            # Update the stored config entry
-            return self.async_create_entry(title="", data=user_input)
+        errors = {}
+        if user_input is not None:
+            try:
+                _check_adaptive_bounds(user_input)
+                # Stored as options, the update listener applies them to the light
+                return self.async_create_entry(title="", data=user_input)
+            except ValueError as e:
+                errors["base"] = f"Error: {e}"
 
-        # Pre-fill current values
-        options = self.config_entry.options
+        # Pre-fill current values, or what was just entered
+        options = {**self.config_entry.options, **(user_input or {})}
         data = self.config_entry.data
 
         motion_sensors = options.get(
@@ -201,23 +301,26 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         auto_off_delay = options.get(
             AUTO_OFF_DELAY_INPUT_NAME, data.get(AUTO_OFF_DELAY_INPUT_NAME, 0)
         )
+        motion_debounce = options.get(
+            MOTION_DEBOUNCE_INPUT_NAME,
+            data.get(MOTION_DEBOUNCE_INPUT_NAME, DEFAULT_MOTION_DEBOUNCE),
+        )
         illuminance_threshold = options.get(
             ILLUMINANCE_THRESHOLD_INPUT_NAME,
             data.get(ILLUMINANCE_THRESHOLD_INPUT_NAME, 0),
         )
+        illuminance_hysteresis = options.get(
+            ILLUMINANCE_HYSTERESIS_INPUT_NAME,
+            data.get(ILLUMINANCE_HYSTERESIS_INPUT_NAME, 0),
+        )
+        darkness_mode = options.get(
+            DARKNESS_MODE_INPUT_NAME,
+            data.get(DARKNESS_MODE_INPUT_NAME, DEFAULT_DARKNESS_MODE),
+        )
+        adjacent_lights = options.get(ADJACENT_LIGHTS_INPUT_NAME, [])
 
-        # Fetch current entities from HA for selectors
-        motion_entities = [
-            state.entity_id
-            for state in self.hass.states.async_all("binary_sensor")
-            if state.attributes.get("device_class")
-            in ("motion", "occupancy", "door", "window", "tamper")
-        ]
-        illuminance_entities = [
-            state.entity_id
-            for state in self.hass.states.async_all("sensor")
-            if state.attributes.get("device_class") == "illuminance"
-        ]
+        # Entities for the selectors, kept current by the shared catalog
+        catalog = async_get_catalog(self.hass)
 
         return self.async_show_form(
             step_id="init",
@@ -226,11 +329,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     vol.Required(
                         AUTO_OFF_DELAY_INPUT_NAME, default=auto_off_delay
                     ): vol.All(vol.Coerce(float), vol.Range(min=0, max=300)),
+                    vol.Required(
+                        MOTION_DEBOUNCE_INPUT_NAME, default=motion_debounce
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
                     vol.Optional(
                         MOTION_SENSOR_INPUT_NAME, default=motion_sensors
                     ): selector.SelectSelector(
                         selector.SelectSelectorConfig(
-                            options=motion_entities, multiple=True
+                            options=catalog.motion_sensors, multiple=True
                         )
                     ),
                     vol.Optional(
@@ -238,13 +344,134 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         default=illuminance_sensor,
                     ): selector.SelectSelector(
                         selector.SelectSelectorConfig(
-                            options=illuminance_entities,
+                            options=catalog.illuminance_sensors,
                             custom_value=True,
                         )
                     ),
                     vol.Required(
                         ILLUMINANCE_THRESHOLD_INPUT_NAME, default=illuminance_threshold
                     ): vol.All(int, vol.Range(min=0, max=1000)),
+                    vol.Required(
+                        ILLUMINANCE_HYSTERESIS_INPUT_NAME, default=illuminance_hysteresis
+                    ): vol.All(int, vol.Range(min=0, max=1000)),
+                    vol.Required(
+                        DARKNESS_MODE_INPUT_NAME, default=darkness_mode
+                    ): _DARKNESS_MODE_SELECTOR,
+                    vol.Optional(
+                        ADJACENT_LIGHTS_INPUT_NAME, default=adjacent_lights
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=catalog.lights, multiple=True
+                        )
+                    ),
+                    **_adaptive_schema(options),
                 }
             ),
+            errors=errors,
+        )
+
+    async def async_step_bulk(self, user_input=None):
+        """Manage the defaults shared by the lights of a bulk entry."""
+        errors = {}
+        if user_input is not None:
+            try:
+                _check_adaptive_bounds(user_input)
+                # The update listener applies the change to every light
+                return self.async_create_entry(
+                    title="", data=_bulk_defaults(user_input)
+                )
+            except ValueError as e:
+                errors["base"] = f"Error: {e}"
+
+        # Pre-fill current values, or what was just entered
+        current = {**self.config_entry.options, **(user_input or {})}
+        return self.async_show_form(
+            step_id="bulk",
+            data_schema=vol.Schema(_bulk_defaults_schema(current)),
+            errors=errors,
         )
+
+
+def _bulk_defaults(user_input: dict) -> dict:
+    """Options applied to every light of a bulk entry."""
+    return {
+        AUTO_OFF_DELAY_INPUT_NAME: user_input.get(AUTO_OFF_DELAY_INPUT_NAME, 0),
+        MOTION_DEBOUNCE_INPUT_NAME: user_input.get(
+            MOTION_DEBOUNCE_INPUT_NAME, DEFAULT_MOTION_DEBOUNCE
+        ),
+        ILLUMINANCE_THRESHOLD_INPUT_NAME: user_input.get(
+            ILLUMINANCE_THRESHOLD_INPUT_NAME, 0
+        ),
+        ILLUMINANCE_HYSTERESIS_INPUT_NAME: user_input.get(
+            ILLUMINANCE_HYSTERESIS_INPUT_NAME, 0
+        ),
+        DARKNESS_MODE_INPUT_NAME: user_input.get(
+            DARKNESS_MODE_INPUT_NAME, DEFAULT_DARKNESS_MODE
+        ),
+        **_adaptive_options(user_input),
+    }
+
+
+def _bulk_defaults_schema(current: dict) -> dict:
+    """Form fields for the defaults of a bulk entry."""
+    return {
+        vol.Required(
+            AUTO_OFF_DELAY_INPUT_NAME,
+            default=current.get(AUTO_OFF_DELAY_INPUT_NAME, 0),
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=300)),
+        vol.Required(
+            MOTION_DEBOUNCE_INPUT_NAME,
+            default=current.get(MOTION_DEBOUNCE_INPUT_NAME, DEFAULT_MOTION_DEBOUNCE),
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+        vol.Required(
+            ILLUMINANCE_THRESHOLD_INPUT_NAME,
+            default=current.get(ILLUMINANCE_THRESHOLD_INPUT_NAME, 0),
+        ): vol.All(int, vol.Range(min=0, max=1000)),
+        vol.Required(
+            ILLUMINANCE_HYSTERESIS_INPUT_NAME,
+            default=current.get(ILLUMINANCE_HYSTERESIS_INPUT_NAME, 0),
+        ): vol.All(int, vol.Range(min=0, max=1000)),
+        vol.Required(
+            DARKNESS_MODE_INPUT_NAME,
+            default=current.get(DARKNESS_MODE_INPUT_NAME, DEFAULT_DARKNESS_MODE),
+        ): _DARKNESS_MODE_SELECTOR,
+        **_adaptive_schema(current),
+    }
+
+
+def _adaptive_options(user_input: dict) -> dict:
+    """Learned auto-off settings of the light and bulk forms."""
+    return {
+        ADAPTIVE_AUTO_OFF_INPUT_NAME: user_input.get(ADAPTIVE_AUTO_OFF_INPUT_NAME, False),
+        AUTO_OFF_MIN_INPUT_NAME: user_input.get(
+            AUTO_OFF_MIN_INPUT_NAME, DEFAULT_AUTO_OFF_MIN
+        ),
+        AUTO_OFF_MAX_INPUT_NAME: user_input.get(
+            AUTO_OFF_MAX_INPUT_NAME, DEFAULT_AUTO_OFF_MAX
+        ),
+    }
+
+
+def _check_adaptive_bounds(user_input: dict):
+    """Reject learned delay bounds that are the wrong way round."""
+    options = _adaptive_options(user_input)
+    if options[AUTO_OFF_MIN_INPUT_NAME] > options[AUTO_OFF_MAX_INPUT_NAME]:
+        raise ValueError("The minimum learned auto off delay is above the maximum")
+
+
+def _adaptive_schema(current: dict) -> dict:
+    """Form fields for the learned auto-off settings."""
+    return {
+        vol.Required(
+            ADAPTIVE_AUTO_OFF_INPUT_NAME,
+            default=current.get(ADAPTIVE_AUTO_OFF_INPUT_NAME, False),
+        ): bool,
+        vol.Required(
+            AUTO_OFF_MIN_INPUT_NAME,
+            default=current.get(AUTO_OFF_MIN_INPUT_NAME, DEFAULT_AUTO_OFF_MIN),
+        ): _AUTO_OFF_BOUND,
+        vol.Required(
+            AUTO_OFF_MAX_INPUT_NAME,
+            default=current.get(AUTO_OFF_MAX_INPUT_NAME, DEFAULT_AUTO_OFF_MAX),
+        ): _AUTO_OFF_BOUND,
+    }
@@ -1,5 +1,7 @@
 DOMAIN = "haas_intelli_lights"
 CONF_GLOBAL_TOGGLE = "global_toggle"
+CONF_METRICS_SENSORS = "metrics_sensors"
+CONF_ZONES = "zones"
 
 #config flow inputs
 LIGHT_ENTYTY_INPUT_NAME = "light_entity"
@@ -7,3 +9,104 @@ MOTION_SENSOR_INPUT_NAME = "motion_sensors"
 ILLUMMINANCE_SENSOR_INPUT_NAME = "illuminance_sensor"
 ILLUMINANCE_THRESHOLD_INPUT_NAME = "illuminance_threshold"
 AUTO_OFF_DELAY_INPUT_NAME = "auto_off_delay"
+ILLUMINANCE_HYSTERESIS_INPUT_NAME = "illuminance_hysteresis"
+MOTION_DEBOUNCE_INPUT_NAME = "motion_debounce"
+DARKNESS_MODE_INPUT_NAME = "darkness_mode"
+ADJACENT_LIGHTS_INPUT_NAME = "adjacent_lights"
+ADAPTIVE_AUTO_OFF_INPUT_NAME = "adaptive_auto_off"
+AUTO_OFF_MIN_INPUT_NAME = "auto_off_min"
+AUTO_OFF_MAX_INPUT_NAME = "auto_off_max"
+
+# bulk config flow inputs
+CONF_LIGHTS = "lights"
+CONF_AREAS = "areas"
+CONF_FLOORS = "floors"
+CONF_LIGHTS_IMPORT = "lights_import"
+
+# Device classes accepted as motion sensors and illuminance sensors
+MOTION_DEVICE_CLASSES = ("motion", "occupancy", "door", "window", "tamper")
+AREA_MOTION_DEVICE_CLASSES = ("motion", "occupancy")
+ILLUMINANCE_DEVICE_CLASS = "illuminance"
+
+# Motion sensor states as (active, inactive), configurable per device class
+MOTION_ACTIVE_STATES = frozenset(("on", "open", "detected", "occupied"))
+MOTION_INACTIVE_STATES = frozenset(("off", "clear", "closed"))
+MOTION_STATES_BY_DEVICE_CLASS = {
+    "motion": (frozenset(("on", "detected")), frozenset(("off", "clear"))),
+    "occupancy": (frozenset(("on", "occupied", "detected")), frozenset(("off", "clear"))),
+    "door": (frozenset(("on", "open")), frozenset(("off", "closed"))),
+    "window": (frozenset(("on", "open")), frozenset(("off", "closed"))),
+}
+
+# Seconds after a motion edge during which further edges of the sensor are dropped
+DEFAULT_MOTION_DEBOUNCE = 2.0
+
+# Seconds to collect light on/off commands before sending them as one call
+COMMAND_BATCH_WINDOW = 0.05
+
+# Light commands per second and burst allowed per integration serving the
+# lights (one Zigbee/Z-Wave mesh or bridge each), 0 disables the rate limit
+CONF_COMMAND_RATE = "command_rate"
+CONF_COMMAND_BURST = "command_burst"
+CONF_COMMAND_RATES = "command_rates"  # integration -> rate/burst overrides
+DEFAULT_COMMAND_RATE = 20.0
+DEFAULT_COMMAND_BURST = 40
+# Queued commands are sent in this order, motion turn-ons before timeouts
+COMMAND_PRIORITIES = {"turn_on": 0, "turn_off": 1}
+
+# Seconds a light gets to report a commanded state before the command is resent
+COMMAND_CONFIRM_TIMEOUT = 5.0
+COMMAND_MAX_RETRIES = 2
+
+# Upper bound of lights processed concurrently by the scheduler and motion events
+MAX_CONCURRENT_LIGHTS = 32
+
+# Seconds a light switched on ahead of need stays on if nobody shows up
+PREACTIVATION_TIMEOUT = 30
+
+# Bounds in minutes of a learned auto-off delay
+DEFAULT_AUTO_OFF_MIN = 1
+DEFAULT_AUTO_OFF_MAX = 30
+# A light learning its delay stays on another ADAPTIVE_RETURN_WINDOW seconds
+# while motion came back that soon after at least this share of the pauses
+# that had lasted as long
+ADAPTIVE_RETURN_WINDOW = 60
+ADAPTIVE_RETURN_SHARE = 0.2
+# Time of day buckets learned separately, 6 buckets of 4 hours
+ADAPTIVE_BUCKETS = 6
+# Pauses a bucket needs before its delay replaces the configured one, and
+# pauses at least as long as a quiet time needed to judge it
+ADAPTIVE_MIN_SAMPLES = 20
+
+# Weight of a new illuminance reading in the moving average, 1 disables smoothing
+ILLUMINANCE_SMOOTHING = 1.0
+
+# Where darkness comes from: the illuminance sensor, the sun, or both
+DARKNESS_MODE_ILLUMINANCE = "illuminance"
+DARKNESS_MODE_SUN = "sun"
+DARKNESS_MODE_SUN_AND_ILLUMINANCE = "sun_and_illuminance"
+DARKNESS_MODES = (
+    DARKNESS_MODE_ILLUMINANCE,
+    DARKNESS_MODE_SUN,
+    DARKNESS_MODE_SUN_AND_ILLUMINANCE,
+)
+DEFAULT_DARKNESS_MODE = DARKNESS_MODE_ILLUMINANCE
+
+# Seconds before sunset and after sunrise that rooms already/still count as dark
+SUN_DARKNESS_MARGIN = 1800
+
+# profile service: wall clock timing only, or also a cProfile/yappi session
+SERVICE_PROFILE = "profile"
+PROFILE_MODE_TIMING = "timing"
+PROFILE_MODE_CPROFILE = "cprofile"
+PROFILE_MODE_YAPPI = "yappi"
+PROFILE_MODES = (PROFILE_MODE_TIMING, PROFILE_MODE_CPROFILE, PROFILE_MODE_YAPPI)
+DEFAULT_PROFILE_DURATION = 60
+
+# Samples kept by each runtime metrics ring buffer
+METRICS_BUFFER_SIZE = 256
+
+# Persisted controller state, written at most once per delay
+STORAGE_KEY = f"{DOMAIN}.state"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
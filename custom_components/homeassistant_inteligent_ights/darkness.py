@@ -0,0 +1,83 @@
+"""Site wide darkness from sunset and sunrise, for lights without a lux sensor"""
+
+import logging
+from datetime import timedelta
+
+from homeassistant.const import SUN_EVENT_SUNRISE, SUN_EVENT_SUNSET
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.sun import get_astral_event_next
+from homeassistant.util import dt as dt_util
+
+from .const import DARKNESS_MODE_ILLUMINANCE, SUN_DARKNESS_MARGIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SunDarkness:
+    """One dark flag for the whole site, flipped by a timer.
+
+    The next transition is computed from the solar events once per flip,
+    never per motion event; the lights using the sun get their ``daylight``
+    flag refreshed when it happens. Rooms count as dark from
+    ``SUN_DARKNESS_MARGIN`` seconds before sunset until as long after sunrise.
+    """
+
+    def __init__(self, hass: HomeAssistant, margin: float = SUN_DARKNESS_MARGIN):
+        self.hass = hass
+        self.margin = timedelta(seconds=margin)
+        self.is_dark = None
+        self.next_change = None
+        self._lights: dict = {}  # light_entity -> LightControl
+        self._unsub = None
+
+    @callback
+    def register(self, light_control):
+        """(Re)attach a light according to its darkness mode."""
+        if light_control.darkness_mode == DARKNESS_MODE_ILLUMINANCE:
+            self.unregister(light_control)
+            return
+        self._lights[light_control.light_entity] = light_control
+        if self._unsub is None:
+            self._update(dt_util.utcnow())
+        light_control.daylight = not self.is_dark
+
+    @callback
+    def unregister(self, light_control):
+        """Detach a light, stopping the timer when nobody uses the sun."""
+        if self._lights.pop(light_control.light_entity, None) is not None:
+            light_control.daylight = False
+        if not self._lights and self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    def diagnostics(self) -> dict:
+        return {
+            "is_dark": self.is_dark,
+            "next_change": self.next_change.isoformat() if self.next_change else None,
+            "lights": len(self._lights),
+        }
+
+    @callback
+    def _handle_change(self, now):
+        self._unsub = None
+        # The timer may fire a hair early, the passed event must not count
+        self._update(max(now, self.next_change))
+        for light_control in self._lights.values():
+            light_control.daylight = not self.is_dark
+
+    @callback
+    def _update(self, now):
+        """Compute the current flag and arm the timer for the next flip."""
+        dark_ends = get_astral_event_next(self.hass, SUN_EVENT_SUNRISE, now, self.margin)
+        dark_starts = get_astral_event_next(
+            self.hass, SUN_EVENT_SUNSET, now, -self.margin
+        )
+        self.is_dark = dark_ends < dark_starts
+        self.next_change = min(dark_ends, dark_starts)
+        self._unsub = async_track_point_in_utc_time(
+            self.hass, self._handle_change, self.next_change
+        )
+        _LOGGER.debug(
+            "Sun darkness is %s until %s", self.is_dark, self.next_change.isoformat()
+        )
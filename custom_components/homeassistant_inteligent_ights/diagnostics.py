@@ -0,0 +1,56 @@
+"""Diagnostics support for Intelli Lights."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .bulk import is_bulk_config
+from .const import DOMAIN, LIGHT_ENTYTY_INPUT_NAME
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    domain_data = hass.data.get(DOMAIN, {})
+    light_config = {**entry.data, **entry.options}
+    instances = domain_data.get("instances", {})
+    metrics = domain_data.get("metrics")
+    darkness = domain_data.get("darkness")
+    profiler = domain_data.get("profiler")
+    profile = profiler.last_summary if profiler else None
+    sun = darkness.diagnostics() if darkness else None
+    mirror = domain_data.get("mirror")
+    mirrored = mirror.diagnostics() if mirror else None
+    adjacency = domain_data.get("adjacency")
+    adjacent = adjacency.diagnostics() if adjacency else None
+
+    if is_bulk_config(light_config):
+        lights = domain_data.get("entries", {}).get(entry.entry_id, [])
+        return {
+            "config": light_config,
+            "lights": {
+                light_entity: instances[light_entity].diagnostics()
+                for light_entity in lights
+                if light_entity in instances
+            },
+            "integration": metrics.as_dict() if metrics else None,
+            "sun_darkness": sun,
+            "light_state_mirror": mirrored,
+            "adjacency": adjacent,
+            "last_profile": profile,
+        }
+
+    light_control = instances.get(light_config.get(LIGHT_ENTYTY_INPUT_NAME))
+    return {
+        "config": light_config,
+        "light": light_control.diagnostics() if light_control else None,
+        "integration": metrics.as_dict() if metrics else None,
+        "sun_darkness": sun,
+        "light_state_mirror": mirrored,
+        "adjacency": adjacent,
+        "last_profile": profile,
+    }
@@ -0,0 +1,203 @@
+"""Shared motion sensor subscriptions fanned out to the lights using them"""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import (
+    DOMAIN,
+    MOTION_ACTIVE_STATES,
+    MOTION_INACTIVE_STATES,
+    MOTION_STATES_BY_DEVICE_CLASS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def motion_state_active(state):
+    """Return True/False for an active/inactive sensor state, None otherwise."""
+    active_states, inactive_states = MOTION_STATES_BY_DEVICE_CLASS.get(
+        state.attributes.get("device_class"),
+        (MOTION_ACTIVE_STATES, MOTION_INACTIVE_STATES),
+    )
+    value = state.state
+    if value in active_states:
+        return True
+    if value in inactive_states:
+        return False
+    # Rare path for sensors reporting non-canonical casing
+    value = value.lower()
+    if value in active_states:
+        return True
+    if value in inactive_states:
+        return False
+    return None
+
+
+class MotionDispatcher:
+    """Subscribes every distinct motion sensor once.
+
+    Keeps an inverted index from sensor to the light controls using it, so
+    a state change is classified a single time and only handed to the
+    affected lights. Motion edges following a fired edge within the sensor's
+    debounce window are dropped; the occupancy counters still follow them.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._lights_by_sensor: dict = {}  # sensor -> {light_entity: LightControl}
+        self._sensors_by_light: dict = {}  # light_entity -> set of sensors
+        self._unsubs: dict = {}  # sensor -> unsubscribe function
+        self._active: set = set()  # sensors currently reporting motion
+        self._debounce: dict = {}  # sensor -> seconds to drop edges after one fired
+        self._last_edge: dict = {}  # sensor -> loop time of the last edge fired
+        # While suspended the index is maintained but nothing is subscribed
+        self.suspended = False
+
+    @callback
+    def register(self, light_control, sensors):
+        """Point a light at a new set of sensors, touching only the diff."""
+        light_entity = light_control.light_entity
+        old_sensors = self._sensors_by_light.get(light_entity, set())
+        new_sensors = set(sensors)
+
+        for sensor in new_sensors - old_sensors:
+            _LOGGER.debug("Added sensor: %s for light: %s", sensor, light_entity)
+            if sensor not in self._lights_by_sensor and not self.suspended:
+                self._subscribe(sensor)
+            self._lights_by_sensor.setdefault(sensor, {})[light_entity] = light_control
+            if sensor in self._active:
+                light_control.active_sensors += 1
+
+        for sensor in old_sensors - new_sensors:
+            _LOGGER.debug("Removed sensor: %s for light: %s", sensor, light_entity)
+            self._remove(sensor, light_entity)
+
+        if new_sensors:
+            self._sensors_by_light[light_entity] = new_sensors
+        else:
+            self._sensors_by_light.pop(light_entity, None)
+
+        # The light's debounce may have changed even if its sensors did not
+        for sensor in new_sensors:
+            self._update_debounce(sensor)
+
+    @callback
+    def unregister(self, light_control):
+        """Drop every sensor subscription held for a light."""
+        light_entity = light_control.light_entity
+        for sensor in self._sensors_by_light.pop(light_entity, set()):
+            self._remove(sensor, light_entity)
+
+    @callback
+    def suspend(self):
+        """Drop every sensor subscription, keeping the index for resume()."""
+        if self.suspended:
+            return
+        self.suspended = True
+        for unsub in self._unsubs.values():
+            unsub()
+        self._unsubs.clear()
+        _LOGGER.debug("Motion listeners suspended")
+
+    @callback
+    def resume(self):
+        """Subscribe every indexed sensor again and recount active sensors."""
+        if not self.suspended:
+            return
+        self.suspended = False
+        # Sensors may have changed while nobody was listening
+        self._active.clear()
+        for lights in self._lights_by_sensor.values():
+            for light_control in lights.values():
+                light_control.active_sensors = 0
+        for sensor, lights in self._lights_by_sensor.items():
+            self._subscribe(sensor)
+            if sensor in self._active:
+                for light_control in lights.values():
+                    light_control.active_sensors += 1
+        _LOGGER.debug("Motion listeners resumed for %s sensor(s)", len(self._unsubs))
+
+    @callback
+    def _update_debounce(self, sensor):
+        """Use the shortest window asked for by the lights of a sensor."""
+        lights = self._lights_by_sensor.get(sensor)
+        if lights:
+            self._debounce[sensor] = min(
+                light_control.motion_debounce for light_control in lights.values()
+            )
+
+    @callback
+    def _subscribe(self, sensor):
+        """Subscribe a sensor and seed its current activity."""
+        self._unsubs[sensor] = async_track_state_change_event(
+            self.hass, sensor, self._handle_sensor_state_change
+        )
+        state = self.hass.states.get(sensor)
+        if state is None:
+            _LOGGER.warning("Motion sensor %s does not exist (yet)", sensor)
+        elif motion_state_active(state):
+            self._active.add(sensor)
+
+    @callback
+    def _remove(self, sensor, light_entity):
+        lights = self._lights_by_sensor.get(sensor)
+        if lights is None:
+            return
+        light_control = lights.pop(light_entity, None)
+        if light_control is not None and sensor in self._active:
+            light_control.active_sensors -= 1
+        if not lights:
+            # Last light using this sensor, release the subscription
+            del self._lights_by_sensor[sensor]
+            if (unsub := self._unsubs.pop(sensor, None)) is not None:
+                unsub()
+            self._active.discard(sensor)
+            self._debounce.pop(sensor, None)
+            self._last_edge.pop(sensor, None)
+        else:
+            self._update_debounce(sensor)
+
+    @callback
+    def _handle_sensor_state_change(self, event):
+        """Classify a sensor transition once and fan out to its lights."""
+        new_state = event.data.get("new_state")
+        old_state = event.data.get("old_state")
+        sensor = event.data.get("entity_id")
+        self.hass.data[DOMAIN]["metrics"].sensor_event(sensor)
+        lights = self._lights_by_sensor.get(sensor, {})
+        active = new_state is not None and motion_state_active(new_state) is True
+
+        # Keep the per-light occupancy counters in step with the sensor
+        if active != (sensor in self._active):
+            if active:
+                self._active.add(sensor)
+                delta = 1
+            else:
+                self._active.discard(sensor)
+                delta = -1
+            for light_control in lights.values():
+                light_control.active_sensors += delta
+
+        # Fire only once on state change from off to on
+        if not active or (
+            old_state is not None and motion_state_active(old_state) is not False
+        ):
+            return
+
+        # Leading edge fires at once, chatter right after it is dropped
+        detected_at = self.hass.loop.time()
+        window = self._debounce.get(sensor)
+        if window:
+            last_edge = self._last_edge.get(sensor)
+            if last_edge is not None and detected_at - last_edge < window:
+                self.hass.data[DOMAIN]["metrics"].sensor_event_suppressed(sensor)
+                return
+            self._last_edge[sensor] = detected_at
+
+        for light_control in lights.values():
+            if light_control.enabled:
+                self.hass.async_create_task(
+                    light_control.handle_motion(sensor, detected_at)
+                )
@@ -0,0 +1,114 @@
+"""Shared illuminance readings turned into per-light darkness flags"""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import ILLUMINANCE_SMOOTHING, DARKNESS_MODE_SUN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IlluminanceMonitor:
+    """Subscribes every distinct illuminance sensor once.
+
+    Readings are parsed (and optionally smoothed with an EWMA) when they
+    arrive, then every light using the sensor gets its ``illuminance_dark`` flag
+    refreshed with its own threshold and hysteresis. Motion handling only
+    reads that flag.
+    """
+
+    def __init__(self, hass: HomeAssistant, smoothing: float = ILLUMINANCE_SMOOTHING):
+        self.hass = hass
+        self.smoothing = smoothing
+        self._values: dict = {}  # sensor -> smoothed reading or None
+        self._lights_by_sensor: dict = {}  # sensor -> {light_entity: LightControl}
+        self._sensor_by_light: dict = {}  # light_entity -> sensor
+        self._unsubs: dict = {}  # sensor -> unsubscribe function
+
+    @callback
+    def register(self, light_control):
+        """(Re)attach a light to its configured illuminance sensor."""
+        light_entity = light_control.light_entity
+        sensor = light_control.illuminance_sensor
+        if (
+            not sensor
+            or not light_control.illuminance_threshold
+            or light_control.darkness_mode == DARKNESS_MODE_SUN
+        ):
+            self.unregister(light_control)
+            # Nothing to compare with, always dark enough
+            light_control.illuminance_dark = True
+            return
+        if self._sensor_by_light.get(light_entity) != sensor:
+            self.unregister(light_control)
+
+        if sensor not in self._unsubs:
+            self._unsubs[sensor] = async_track_state_change_event(
+                self.hass, sensor, self._handle_sensor_state_change
+            )
+            self._values[sensor] = self._parse(sensor, self.hass.states.get(sensor))
+
+        self._lights_by_sensor.setdefault(sensor, {})[light_entity] = light_control
+        self._sensor_by_light[light_entity] = sensor
+
+        value = self._values[sensor]
+        light_control.illuminance_dark = (
+            value is not None and value <= light_control.illuminance_threshold
+        )
+
+    @callback
+    def unregister(self, light_control):
+        """Detach a light, releasing the sensor when nobody uses it."""
+        light_entity = light_control.light_entity
+        sensor = self._sensor_by_light.pop(light_entity, None)
+        if sensor is None:
+            return
+        lights = self._lights_by_sensor[sensor]
+        lights.pop(light_entity, None)
+        if not lights:
+            del self._lights_by_sensor[sensor]
+            del self._values[sensor]
+            self._unsubs.pop(sensor)()
+
+    @staticmethod
+    def _parse(sensor, state):
+        """Convert a sensor state to a number, None when unusable."""
+        if state is None:
+            _LOGGER.warning("Illuminance sensor %s missing", sensor)
+            return None
+        try:
+            return float(state.state)
+        except (ValueError, TypeError):
+            _LOGGER.warning(
+                "Invalid illuminance value for %s: %s", sensor, state.state
+            )
+            return None
+
+    @callback
+    def _handle_sensor_state_change(self, event):
+        """Parse a new reading once and refresh the lights using it."""
+        sensor = event.data.get("entity_id")
+        if sensor not in self._lights_by_sensor:
+            return
+
+        value = self._parse(sensor, event.data.get("new_state"))
+        previous = self._values.get(sensor)
+        if value is not None and previous is not None:
+            value = self.smoothing * value + (1 - self.smoothing) * previous
+        self._values[sensor] = value
+
+        for light_control in self._lights_by_sensor[sensor].values():
+            if value is None:
+                light_control.illuminance_dark = False
+            elif light_control.illuminance_dark:
+                # Only leave darkness once clearly above the threshold
+                light_control.illuminance_dark = value <= (
+                    light_control.illuminance_threshold
+                    + light_control.illuminance_hysteresis
+                )
+            else:
+                light_control.illuminance_dark = (
+                    value <= light_control.illuminance_threshold
+                )
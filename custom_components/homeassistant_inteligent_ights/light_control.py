@@ -1,265 +1,808 @@
 """This class handles single light to track it motion sensor"""
 
 import logging
-
-# import asyncio
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.typing import ConfigType
 
 from .const import (
     DOMAIN,
     LIGHT_ENTYTY_INPUT_NAME,
-    CONF_GLOBAL_TOGGLE,
+    CONF_ZONES,
     MOTION_SENSOR_INPUT_NAME,
     ILLUMMINANCE_SENSOR_INPUT_NAME,
     ILLUMINANCE_THRESHOLD_INPUT_NAME,
+    ILLUMINANCE_HYSTERESIS_INPUT_NAME,
     AUTO_OFF_DELAY_INPUT_NAME,
+    MOTION_DEBOUNCE_INPUT_NAME,
+    DEFAULT_MOTION_DEBOUNCE,
+    DARKNESS_MODE_INPUT_NAME,
+    DEFAULT_DARKNESS_MODE,
+    ADJACENT_LIGHTS_INPUT_NAME,
+    PREACTIVATION_TIMEOUT,
+    ADAPTIVE_AUTO_OFF_INPUT_NAME,
+    AUTO_OFF_MIN_INPUT_NAME,
+    AUTO_OFF_MAX_INPUT_NAME,
+    DEFAULT_AUTO_OFF_MIN,
+    DEFAULT_AUTO_OFF_MAX,
+    COMMAND_CONFIRM_TIMEOUT,
+    COMMAND_MAX_RETRIES,
+)
+from .adaptive import AdaptiveTimeout
+from .metrics import StateClock
+from .mirror import light_code
+from .state_table import (
+    FLAG_OFF_BY_INTEGRATION,
+    FLAG_DARK,
+    FLAG_DAYLIGHT,
+    LIGHT_OFF,
+    LIGHT_ON,
+    LIGHT_STATES,
+    LIGHT_UNKNOWN,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+NAN = float("nan")
+# Timers may fire within the loop's clock resolution, a bit early is on time
+TIMER_SLACK = 0.001
+# Name of each light_state value, for logs and diagnostics
+LIGHT_STATE_NAMES = {code: name for name, code in LIGHT_STATES.items()}
+
 
 class LightControl:
-    """Class for Intelligent lights control in HomeAssistant"""
+    """Class for Intelligent lights control in HomeAssistant
+
+    The fields touched on every event (flags, timer start, auto-off delay,
+    deadline) live in one row of the shared ``LightStateTable``; the
+    properties below are a view over that row.
+    """
 
     def __init__(self, hass: HomeAssistant, config: dict):
         self.hass = hass
         # Light to be controlled
         self.light_entity = config.get(LIGHT_ENTYTY_INPUT_NAME)
+        self._table = hass.data[DOMAIN]["table"]
+        self._row = self._table.add(self.light_entity)
+        # Seeded once, then kept current by the shared light state mirror
+        self._table.light_state[self._row] = light_code(
+            hass.states.get(self.light_entity)
+        )
         # Motion sensor to controll the light
         self.motion_sensors = config.get(MOTION_SENSOR_INPUT_NAME, [])
         if isinstance(self.motion_sensors, str):
             # Normalize to list so the rest of the code can always iterate
             self.motion_sensors = [self.motion_sensors]
+        # Seconds during which repeated motion edges of a sensor are ignored
+        self.motion_debounce = config.get(
+            MOTION_DEBOUNCE_INPUT_NAME, DEFAULT_MOTION_DEBOUNCE
+        )
         # Sensor to check before desiding if is dark enought
         self.illuminance_sensor = config.get(ILLUMMINANCE_SENSOR_INPUT_NAME)
         # Threshold for darkness
         self.illuminance_threshold = config.get(ILLUMINANCE_THRESHOLD_INPUT_NAME, 0)
+        # Margin above the threshold before a dark room counts as bright again
+        self.illuminance_hysteresis = config.get(ILLUMINANCE_HYSTERESIS_INPUT_NAME, 0)
+        self.illuminance_dark = True
+        # Illuminance sensor, sun or both decide whether it is dark
+        self.darkness_mode = config.get(DARKNESS_MODE_INPUT_NAME, DEFAULT_DARKNESS_MODE)
+        # Pause statistics the auto-off delay is learned from, None when fixed
+        self.adaptive = None
+        self._adaptive_config = None
+        # Loop time of the last motion of this light's sensors, where the
+        # current pause started
+        self._pause_started_at = None
+        self._configure_adaptive(config)
         # Auto turnoff delay if no motion
         self.auto_off_delay = config.get(AUTO_OFF_DELAY_INPUT_NAME, 0)
-        self.last_motion_time = None
-        self.off_by_integration = False
-        self.motion_unsubs: list = []  # store unsubscribe functions for motion sensors
-        self.light_unsub = None  # store unsubscribe function for light entity
+        # Lights people usually reach next, switched on ahead of need
+        self.adjacent_lights = list(config.get(ADJACENT_LIGHTS_INPUT_NAME, []))
+        # On ahead of need and nobody seen yet, off after PREACTIVATION_TIMEOUT
+        self._speculative = False
+        # How long the light spent in each off_by_integration / timer state
+        self._off_by_integration_clock = StateClock(False)
+        self._timer_clock = StateClock("idle")
+        self._motion_detected_at = None
+        # Command sent but not yet confirmed by the light: target state,
+        # loop time it was issued, retries so far and the confirm timer
+        self.pending_target = None
+        self._pending_issued_at = None
+        self._pending_retries = 0
+        self._confirm_handle = None
+        # Global, floor and area switches folded into one flag by the zones
+        self._enabled = True
+        # Number of motion sensors currently active, kept by the dispatcher
+        self.active_sensors = 0
+        # Set once unloaded, work still queued for the light is then dropped
+        self._torn_down = False
+        # Serializes work for this light so its events are handled in order
+        self._lock = asyncio.Lock()
         _LOGGER.info("Loaded: %s", config)
 
+    def _get_flag(self, flag: int) -> bool:
+        return bool(self._table.flags[self._row] & flag)
+
+    def _set_flag(self, flag: int, value: bool):
+        if value:
+            self._table.flags[self._row] |= flag
+        else:
+            self._table.flags[self._row] &= ~flag & 0xFF
+
+    @property
+    def off_by_integration(self) -> bool:
+        """Whether the integration turned the light off."""
+        return self._get_flag(FLAG_OFF_BY_INTEGRATION)
+
+    @off_by_integration.setter
+    def off_by_integration(self, value: bool):
+        self._set_flag(FLAG_OFF_BY_INTEGRATION, value)
+        self._off_by_integration_clock.set(value)
+        self.hass.data[DOMAIN]["store"].async_schedule_save(self)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the global, floor and area switches let the light work."""
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        if not value:
+            # No motion is forwarded while disabled, so the pause in progress
+            # would wrongly span that time
+            self._pause_started_at = None
+        self._enabled = value
+
+    @property
+    def is_dark(self) -> bool:
+        """Dark enough to turn on, one read of the flags kept current elsewhere."""
+        flags = self._table.flags[self._row]
+        return bool(flags & (FLAG_DARK | FLAG_DAYLIGHT) == FLAG_DARK)
+
+    @property
+    def illuminance_dark(self) -> bool:
+        """Darkness flag kept up to date by the illuminance monitor."""
+        return self._get_flag(FLAG_DARK)
+
+    @illuminance_dark.setter
+    def illuminance_dark(self, value: bool):
+        self._set_flag(FLAG_DARK, value)
+
+    @property
+    def daylight(self) -> bool:
+        """Sun flag kept up to date by the sun darkness timer."""
+        return self._get_flag(FLAG_DAYLIGHT)
+
+    @daylight.setter
+    def daylight(self, value: bool):
+        self._set_flag(FLAG_DAYLIGHT, value)
+
+    @property
+    def light_state(self) -> int:
+        """Last state the light reported, as mirrored in the table."""
+        return int(self._table.light_state[self._row])
+
+    @property
+    def auto_off_delay(self) -> float:
+        """Configured auto turnoff delay in minutes."""
+        return self._auto_off_delay
+
+    @auto_off_delay.setter
+    def auto_off_delay(self, minutes: float):
+        self._auto_off_delay = minutes
+        self._apply_auto_off()
+
+    @callback
+    def _apply_auto_off(self):
+        """Put the delay for this time of day in the table, in seconds."""
+        seconds = self._auto_off_delay * 60
+        if self.adaptive is not None and seconds > 0:
+            seconds = self.adaptive.timeout(datetime.now().hour, seconds)
+        self._table.auto_off[self._row] = seconds
+
+    @callback
+    def _configure_adaptive(self, config: dict):
+        """Create, rebound or drop the learned delay, keeping what was learned."""
+        adaptive = (
+            config.get(ADAPTIVE_AUTO_OFF_INPUT_NAME, False),
+            config.get(AUTO_OFF_MIN_INPUT_NAME, DEFAULT_AUTO_OFF_MIN),
+            config.get(AUTO_OFF_MAX_INPUT_NAME, DEFAULT_AUTO_OFF_MAX),
+        )
+        self._adaptive_config = adaptive
+        enabled, minimum, maximum = adaptive
+        if not enabled:
+            self.adaptive = None
+        elif self.adaptive is None:
+            self.adaptive = AdaptiveTimeout(minimum * 60, maximum * 60)
+        else:
+            self.adaptive.rebound(minimum * 60, maximum * 60)
+
+    @property
+    def motion_at(self):
+        """Loop time the auto-off timer was last restarted, None when idle."""
+        motion_at = float(self._table.motion_at[self._row])
+        return None if motion_at != motion_at else motion_at  # nan when idle
+
+    @motion_at.setter
+    def motion_at(self, value):
+        self._table.motion_at[self._row] = NAN if value is None else value
+        self._timer_clock.set("idle" if value is None else "running")
+        self.hass.data[DOMAIN]["store"].async_schedule_save(self)
+
+    @property
+    def last_motion_time(self):
+        """Wall clock time of motion_at, used to persist the timer."""
+        motion_at = self.motion_at
+        if motion_at is None:
+            return None
+        return datetime.now() - timedelta(seconds=self.hass.loop.time() - motion_at)
+
+    @last_motion_time.setter
+    def last_motion_time(self, value):
+        if value is None:
+            self.motion_at = None
+        else:
+            elapsed = (datetime.now() - value).total_seconds()
+            self.motion_at = self.hass.loop.time() - elapsed
+
+    @callback
+    def teardown(self):
+        """Release every subscription and timer held for this light."""
+        self._torn_down = True
+        self.clear_pending_command()
+        domain_data = self.hass.data[DOMAIN]
+        domain_data["mirror"].unregister(self)
+        domain_data["dispatcher"].unregister(self)
+        domain_data["illuminance"].unregister(self)
+        domain_data["darkness"].unregister(self)
+        domain_data[CONF_ZONES].unregister(self)
+        domain_data["adjacency"].unregister(self)
+        domain_data["scheduler"].cancel(self.light_entity)
+        self.detach()
+
+    @callback
+    def detach(self):
+        """Move this light out of the shared table once it is unloaded."""
+        self._table = self._table.remove(self.light_entity)
+        self._row = 0
+
+    @callback
+    def restore(
+        self, off_by_integration: bool = False, last_motion_time=None, adaptive=None
+    ):
+        """Apply the saved state, reconciled with the current light state."""
+        self.off_by_integration = off_by_integration
+        self.last_motion_time = last_motion_time
+        if self.adaptive is not None and adaptive:
+            self.adaptive.load(adaptive)
+            self._apply_auto_off()
+        self.reconcile()
+
+    @callback
+    def reconcile(self):
+        """Align the timer with the current light state and re-arm it."""
+        light_state = self.light_state
+        if light_state not in (LIGHT_ON, LIGHT_OFF):
+            # Light not loaded yet, its first state report reconciles it
+            return
+        if light_state == LIGHT_ON:
+            if self.motion_at is None:
+                # Start a timer for lights left on
+                self.motion_at = self.hass.loop.time()
+        elif self.motion_at is not None:
+            self.motion_at = None
+        self._schedule_timeout()
+
+    def diagnostics(self) -> dict:
+        """Current state of this light for the diagnostics download."""
+        return {
+            "light_entity": self.light_entity,
+            "motion_sensors": self.motion_sensors,
+            "motion_debounce": self.motion_debounce,
+            "active_sensors": self.active_sensors,
+            "enabled": self.enabled,
+            "zones": list(
+                self.hass.data[DOMAIN][CONF_ZONES].zones_of(self.light_entity)
+            ),
+            "auto_off_delay": self.auto_off_delay,
+            "effective_auto_off_seconds": float(self._table.auto_off[self._row]),
+            "adaptive_auto_off": self.adaptive
+            and self.adaptive.as_dict(self.auto_off_delay * 60),
+            "illuminance_sensor": self.illuminance_sensor,
+            "is_dark": self.is_dark,
+            "darkness_mode": self.darkness_mode,
+            "daylight": self.daylight,
+            "adjacent_lights": self.adjacent_lights,
+            "speculative": self._speculative,
+            "light_state": LIGHT_STATE_NAMES.get(self.light_state),
+            "light_changed_seconds_ago": self._light_changed_ago(),
+            "pending_command": self.pending_target
+            and {
+                "target": LIGHT_STATE_NAMES[self.pending_target],
+                "age_seconds": self.hass.loop.time() - self._pending_issued_at,
+                "retries": self._pending_retries,
+            },
+            "last_motion_time": (
+                self.last_motion_time.isoformat() if self.last_motion_time else None
+            ),
+            "off_by_integration": self._off_by_integration_clock.as_dict(),
+            "timer": self._timer_clock.as_dict(),
+        }
+
+    @callback
+    def reconfigure(self, config: dict) -> bool:
+        """Swap in a new config, touching only the subscriptions that changed.
+
+        Every field is assigned before anything else runs, so no event sees
+        a half applied config. Returns whether anything changed.
+        """
+        motion_sensors = config.get(MOTION_SENSOR_INPUT_NAME, [])
+        if isinstance(motion_sensors, str):
+            motion_sensors = [motion_sensors]
+        motion = (
+            motion_sensors,
+            config.get(MOTION_DEBOUNCE_INPUT_NAME, DEFAULT_MOTION_DEBOUNCE),
+            config.get(AUTO_OFF_DELAY_INPUT_NAME, 0),
+        )
+        illuminance = (
+            config.get(ILLUMMINANCE_SENSOR_INPUT_NAME),
+            config.get(ILLUMINANCE_THRESHOLD_INPUT_NAME, 0),
+            config.get(ILLUMINANCE_HYSTERESIS_INPUT_NAME, 0),
+            config.get(DARKNESS_MODE_INPUT_NAME, DEFAULT_DARKNESS_MODE),
+        )
+        motion_changed = motion != (
+            self.motion_sensors,
+            self.motion_debounce,
+            self.auto_off_delay,
+        )
+        illuminance_changed = illuminance != (
+            self.illuminance_sensor,
+            self.illuminance_threshold,
+            self.illuminance_hysteresis,
+            self.darkness_mode,
+        )
+        adjacent_lights = list(config.get(ADJACENT_LIGHTS_INPUT_NAME, []))
+        adjacency_changed = adjacent_lights != self.adjacent_lights
+        adaptive_config = self._adaptive_config
+        self._configure_adaptive(config)
+        adaptive_changed = adaptive_config != self._adaptive_config
+        if not (
+            motion_changed or illuminance_changed or adjacency_changed or adaptive_changed
+        ):
+            return False
+
+        # Also applies the new learned delay bounds
+        self.motion_sensors, self.motion_debounce, self.auto_off_delay = motion
+        (
+            self.illuminance_sensor,
+            self.illuminance_threshold,
+            self.illuminance_hysteresis,
+            self.darkness_mode,
+        ) = illuminance
+        self.adjacent_lights = adjacent_lights
+        if motion_changed:
+            # The dispatcher only adds and removes the sensors that differ
+            sensors = self.motion_sensors if self.auto_off_delay else []
+            self.hass.data[DOMAIN]["dispatcher"].register(self, sensors)
+        if motion_changed or adaptive_changed:
+            self._schedule_timeout()
+        if illuminance_changed:
+            self.hass.data[DOMAIN]["illuminance"].register(self)
+            self.hass.data[DOMAIN]["darkness"].register(self)
+        if adjacency_changed:
+            self.hass.data[DOMAIN]["adjacency"].register(self)
+        _LOGGER.debug("Reconfigured %s", self.light_entity)
+        return True
+
     async def initialize(self):
         """Initialize motion tracking and start the scheduler."""
-        for unsub in self.motion_unsubs:
-            unsub()
-        self.motion_unsubs = []
+        sensors = self.motion_sensors if self.auto_off_delay else []
+        _LOGGER.debug(
+            "Setting up motion sensors %s for %s", sensors, self.light_entity
+        )
+        # Motion sensors are subscribed once per domain and shared by lights
+        self.hass.data[DOMAIN]["dispatcher"].register(self, sensors)
+        self.hass.data[DOMAIN]["illuminance"].register(self)
+        self.hass.data[DOMAIN]["darkness"].register(self)
+        self.hass.data[DOMAIN][CONF_ZONES].register(self)
+        self.hass.data[DOMAIN]["adjacency"].register(self)
+        # Light state changes (manual override detection) come from the mirror
+        self.hass.data[DOMAIN]["mirror"].register(self)
 
-        if self.motion_sensors and self.auto_off_delay:
-            _LOGGER.debug(
-                "Setting up motion sensors %s for %s",
-                self.motion_sensors,
-                self.light_entity,
-            )
-            for sensor in self.motion_sensors:
-                _LOGGER.debug(
-                    "Added sensor: %s for light: %s",
-                    sensor,
-                    self.light_entity,
-                )
-                # Track motion sensor state changes
-                unsub = async_track_state_change_event(
-                    self.hass,
-                    sensor,
-                    self._handle_motion_detected(self.light_entity),
-                )
-                self.motion_unsubs.append(unsub)
+        # Re-arm the timeout with the (possibly changed) auto-off delay
+        self._schedule_timeout()
 
-        # Track light state changes (manual override detection)
-        if self.light_unsub is None:
-            _LOGGER.debug("Registered callback for light tracking")
-            self.light_unsub = async_track_state_change_event(
-                self.hass,
-                self.light_entity,
-                self._handle_light_state_change(self.light_entity),
-            )
+    async def _serialized(self, job, *args):
+        """Run work for this light in order, bounded across all lights."""
+        async with self._lock:
+            async with self.hass.data[DOMAIN]["concurrency"]:
+                if self._torn_down:
+                    # Queued before the light was unloaded
+                    return
+                await job(*args)
+
+    @asynccontextmanager
+    async def _released(self):
+        """Let other work for this light run while a command is on its way.
+
+        A command may wait for the rate limit, so a motion turn-on can then
+        supersede a queued turn-off, and waiting lights hold no concurrency
+        slot. Both are taken back, in the same order, before returning.
+        """
+        concurrency = self.hass.data[DOMAIN]["concurrency"]
+        concurrency.release()
+        self._lock.release()
+        try:
+            yield
+        finally:
+            await self._reacquire(concurrency)
+
+    async def _reacquire(self, concurrency):
+        """Take the light lock and a concurrency slot back, even if cancelled.
+
+        The enclosing ``async with`` blocks release both on the way out, so
+        a cancellation must not stop this half way. The acquiring runs in a
+        task of its own and the cancellation is raised once it holds both.
+        """
+
+        async def _acquire():
+            await self._lock.acquire()
+            await concurrency.acquire()
+
+        task = self.hass.loop.create_task(_acquire())
+        cancelled = False
+        while not task.done():
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                cancelled = True
+        if cancelled:
+            raise asyncio.CancelledError
 
     async def check_timeout(self):
         """Check if the light should be turned off due to inactivity."""
+        started = self.hass.loop.time()
+        await self._serialized(self._check_timeout)
+        self.hass.data[DOMAIN]["metrics"].check_timeout_duration.add(
+            self.hass.loop.time() - started
+        )
+
+    async def _check_timeout(self):
         try:
             # _LOGGER.debug("Checking timeouts for %s", self.light_entity)
 
-            global_toggle = self.hass.data[DOMAIN].get(CONF_GLOBAL_TOGGLE)
-            if global_toggle and not global_toggle.is_on:
-                _LOGGER.debug(
-                    "Global toggle OFF, ignoring timeouts for %s", self.light_entity
-                )
+            if not self.enabled:
+                _LOGGER.debug("Disabled, ignoring timeouts for %s", self.light_entity)
+                # Re-armed by reconcile() once the light is enabled again
                 return
-            light_state = self.hass.states.get(self.light_entity)
-            if not light_state or light_state.state != "on":
+            if self._intended_state() != LIGHT_ON:
                 # _LOGGER.debug(
                 #    "Skipping %s, not on or missing state!", self.light_entity
                 # )
                 return
 
-            if self.auto_off_delay <= 0 or not self.last_motion_time:
+            deadline = self._deadline()
+            if deadline is None:
                 _LOGGER.debug(
                     "Skipping %s, no timestamp or timeout set!", self.light_entity
                 )
                 return
 
-            time_diff = datetime.now() - self.last_motion_time
-            if time_diff >= timedelta(minutes=self.auto_off_delay):
+            if deadline - self.hass.loop.time() > TIMER_SLACK:
+                # Woken up early, e.g. the delay was changed meanwhile
+                self._schedule_timeout()
+                return
+
+            _LOGGER.debug(
+                "Checking sensors for %s as timeout expired", self.light_entity
+            )
+            if self.active_sensors > 0:
                 _LOGGER.debug(
-                    "Checking sensors for %s as timeout expired", self.light_entity
+                    "Motion still active for %s on %s sensor(s)",
+                    self.light_entity,
+                    self.active_sensors,
                 )
-                for sensor in self.motion_sensors:
-                    sensor_state = self.hass.states.get(sensor)
-                    if sensor_state is None:
-                        _LOGGER.warning(
-                            "Motion sensor %s for light %s does not exist (skipping)",
-                            sensor,
-                            self.light_entity,
-                        )
-                        continue
-                    _LOGGER.debug(
-                        "%s: %s - %s", self.light_entity, sensor, sensor_state.state
-                    )
-                    if sensor_state and sensor_state.state.lower() in [
-                        "occupied",
-                        "detected",
-                        "open",
-                        "on",
-                    ]:
-                        _LOGGER.debug(
-                            "Motion still active for %s via %s - %s ",
-                            self.light_entity,
-                            sensor,
-                            sensor_state.state,
-                        )
-                        self.last_motion_time = datetime.now()
-                        return
-                _LOGGER.debug("Turning off %s due to timeout", self.light_entity)
-                self.off_by_integration = True
-                await self._light_turn_off()
+                await self._light_reset_timer()
+                return
+            _LOGGER.debug("Turning off %s due to timeout", self.light_entity)
+            if self._speculative:
+                # Switched on ahead of need and nobody came
+                self._speculative = False
+                self.hass.data[DOMAIN]["metrics"].preactivation_event("missed")
+            self.off_by_integration = True
+            if not await self._light_command(LIGHT_OFF):
+                self.off_by_integration = False
 
         except Exception as e:
             _LOGGER.exception("check_timeout crashed for %s: %s", self.light_entity, e)
 
-    @callback
-    def _handle_motion_detected(self, light_entity):
-        """Handle motion detected events."""
+    async def handle_motion(self, sensor, detected_at=None):
+        """Handle motion detected by one of the sensors of this light."""
+        if self.enabled:
+            # Before waiting for this light, the next rooms get a head start
+            self.hass.data[DOMAIN]["adjacency"].pre_activate(self.light_entity)
+        await self._serialized(self._handle_motion, sensor, detected_at)
 
-        async def state_change(event):
-            global_toggle = self.hass.data[DOMAIN].get(CONF_GLOBAL_TOGGLE)
-            if global_toggle and not global_toggle.is_on:
-                _LOGGER.debug("Global toggle OFF, ignoring motion for %s", light_entity)
-                return
+    async def _handle_motion(self, sensor, detected_at):
+        if not self.enabled:
+            return
+        if self.adaptive is not None:
+            self._learn_pause(detected_at)
+        self._motion_detected_at = detected_at
+        if self._speculative:
+            # Someone arrived where the light was switched on ahead of need
+            self._speculative = False
+            self.hass.data[DOMAIN]["metrics"].preactivation_event("used")
+        state = self._intended_state()
+        _LOGGER.debug(
+            "Motion detected for %s from %s, currently: %s",
+            self.light_entity,
+            sensor,
+            LIGHT_STATE_NAMES.get(state),
+        )
 
-            new_state = event.data.get("new_state")
-            old_state = event.data.get("old_state")
-            if not new_state:
-                return
-            # Fire only once on state change from off to on
-            if (
-                old_state is None
-                or old_state.state.lower() in ("off", "clear", "closed")
-            ) and new_state.state.lower() in ("on", "open", "detected", "occupied"):
-                light_state = self.hass.states.get(light_entity)
-                _LOGGER.debug(
-                    "Motion detected for %s from %s, currently: %s",
-                    light_entity,
-                    event.data.get("entity_id"),
-                    light_state and light_state.state,
-                )
+        if state == LIGHT_OFF:
+            await self._light_smart_turn_on()
+        elif state == LIGHT_ON:
+            # Reset timer on motion while light is on
+            await self._light_reset_timer()
+
+    @callback
+    def _learn_pause(self, detected_at=None):
+        """Feed the pause since the previous motion, whatever the light did."""
+        if detected_at is None:
+            detected_at = self.hass.loop.time()
+        if self._pause_started_at is not None:
+            pause = detected_at - self._pause_started_at
+            self.adaptive.observe(pause, datetime.now().hour)
+        self._pause_started_at = detected_at
+        # The bucket may also have changed since the last motion
+        self._apply_auto_off()
 
-                if light_state and light_state.state == "off":
-                    await self._light_smart_turn_on(light_state)
-                elif light_state and light_state.state == "on":
-                    # Reset timer on motion while light is on
-                    await self._light_reset_timer()
+    @callback
+    def anticipate(self):
+        """Motion next door, someone may be on their way to this light."""
+        self.hass.async_create_task(self._serialized(self._anticipate))
 
-        return state_change
+    async def _anticipate(self):
+        if not self.enabled or self._table.auto_off[self._row] <= 0:
+            # Without a timer nothing would turn a wrong guess off again
+            return
+        state = self._intended_state()
+        if state == LIGHT_ON and self._speculative:
+            # Still waiting for the last pass, give it another window
+            self._start_speculative_timer()
+        elif state == LIGHT_OFF:
+            await self._light_smart_turn_on(speculative=True)
 
     @callback
-    def _handle_light_state_change(self, light_entity):
-        """Track manual light changes."""
+    def light_state_seen(self, code: int):
+        """Record a state reported by the light and react to it in order."""
+        previous = self._table.light_state[self._row]
+        changed = code != previous
+        if changed:
+            self._table.light_state[self._row] = code
+            self._table.light_changed_at[self._row] = self.hass.loop.time()
+        self.hass.async_create_task(
+            self._serialized(
+                self._light_state_changed, code, changed, previous == LIGHT_UNKNOWN
+            )
+        )
 
-        async def state_change(event):
-            new_state = event.data.get("new_state")
-            if new_state and new_state.state == "on":
-                _LOGGER.debug("Turn on detected for %s.", light_entity)
+    async def _light_state_changed(self, code: int, changed: bool, first: bool):
+        """Track manual light changes."""
+        if changed:
+            # The light reported a transition, be it ours or a manual one
+            self.clear_pending_command()
+        if first and code in (LIGHT_ON, LIGHT_OFF):
+            # First state since the light was loaded, e.g. at boot: not a
+            # transition, so the restored timer is kept
+            self.reconcile()
+        elif code == LIGHT_ON:
+            _LOGGER.debug("Turn on detected for %s.", self.light_entity)
+            if not self._speculative:
                 await self._light_reset_timer()
-            if new_state and new_state.state == "off":
-                self.last_motion_time = None
-                #self.off_by_integration = False
-                _LOGGER.debug("Turn off detected %s.", light_entity)
-
-        return state_change
-
-    async def _light_turn_on(self):
-        """Turn on the light."""
-        _LOGGER.debug("Turning on light %s.", self.light_entity)
-        await self.hass.services.async_call(
-            "light", "turn_on", {"entity_id": self.light_entity}
+        elif code == LIGHT_OFF:
+            self._speculative = False
+            self.motion_at = None
+            self.hass.data[DOMAIN]["scheduler"].cancel(self.light_entity)
+            #self.off_by_integration = False
+            _LOGGER.debug("Turn off detected %s.", self.light_entity)
+
+    def _intended_state(self) -> int:
+        """State the light is heading to, preferring an unconfirmed command."""
+        if self.pending_target is not None:
+            return self.pending_target
+        return self.light_state
+
+    def _light_changed_ago(self):
+        changed_at = float(self._table.light_changed_at[self._row])
+        if changed_at != changed_at:  # nan until the first change
+            return None
+        return self.hass.loop.time() - changed_at
+
+    async def _light_command(self, target: int) -> bool:
+        """Turn the light on or off, False when the command did not go out."""
+        name = LIGHT_STATE_NAMES[target]
+        _LOGGER.debug("Turning %s light %s.", name, self.light_entity)
+        sent = await self._async_command(target)
+        if sent is None:
+            _LOGGER.debug(
+                "Turning %s light %s was superseded.", name, self.light_entity
+            )
+            return False
+        if not sent:
+            _LOGGER.warning("Turning %s light %s failed.", name, self.light_entity)
+            return False
+        return True
+
+    async def _async_command(self, target: int) -> bool | None:
+        """Send at most one command per transition and wait for confirmation.
+
+        Returns None when a newer command for the light replaced it.
+        """
+        metrics = self.hass.data[DOMAIN]["metrics"]
+        if self.pending_target == target:
+            # Already on its way, the light just has not reported back yet
+            metrics.command_event("deduplicated")
+            return True
+        self.clear_pending_command()
+        self.pending_target = target
+        self._pending_issued_at = self.hass.loop.time()
+        sent = await self._async_send(target)
+        if not sent or self._torn_down:
+            # Nothing waits for the confirmation of an unloaded light
+            return sent
+        self._confirm_handle = self.hass.loop.call_later(
+            COMMAND_CONFIRM_TIMEOUT, self._confirm_timeout, target
         )
+        return True
+
+    async def _async_send(self, target: int) -> bool | None:
+        batcher = self.hass.data[DOMAIN]["batcher"]
+        service = f"turn_{LIGHT_STATE_NAMES[target]}"
+        async with self._released():
+            sent = await batcher.async_call(service, self.light_entity)
+        if sent:
+            return True
+        metrics = self.hass.data[DOMAIN]["metrics"]
+        if sent is None:
+            # The newer command owns pending_target now
+            metrics.command_event("superseded")
+            return None
+        metrics.command_event("failed")
+        if self.pending_target == target:
+            self.clear_pending_command()
+        return False
+
+    @callback
+    def clear_pending_command(self):
+        """Forget the unconfirmed command, if any."""
+        if self._confirm_handle is not None:
+            self._confirm_handle.cancel()
+            self._confirm_handle = None
+        self.pending_target = None
+        self._pending_retries = 0
 
-    async def _light_turn_off(self):
-        """Turn off the light."""
-        _LOGGER.debug("Turning off light %s.", self.light_entity)
-        await self.hass.services.async_call(
-            "light", "turn_off", {"entity_id": self.light_entity}
+    @callback
+    def _confirm_timeout(self, target: int):
+        """The light did not report the commanded state in time."""
+        self._confirm_handle = None
+        if self.pending_target != target:
+            return
+        if self._pending_retries >= COMMAND_MAX_RETRIES:
+            _LOGGER.warning(
+                "Light %s never confirmed turning %s, giving up",
+                self.light_entity,
+                LIGHT_STATE_NAMES[target],
+            )
+            self.hass.data[DOMAIN]["metrics"].command_event("unconfirmed")
+            self.clear_pending_command()
+            return
+        self.hass.async_create_task(self._serialized(self._retry_command, target))
+
+    async def _retry_command(self, target: int):
+        if self.pending_target != target:
+            return
+        if self.light_state == target:
+            self.clear_pending_command()
+            return
+        self._pending_retries += 1
+        _LOGGER.debug(
+            "Retrying turn %s for %s (%s)",
+            LIGHT_STATE_NAMES[target],
+            self.light_entity,
+            self._pending_retries,
         )
+        self.hass.data[DOMAIN]["metrics"].command_event("retried")
+        if await self._async_send(target):
+            self._confirm_handle = self.hass.loop.call_later(
+                COMMAND_CONFIRM_TIMEOUT, self._confirm_timeout, target
+            )
 
     async def _light_reset_timer(self):
         """Reset the motion timer for the given light."""
         _LOGGER.debug("Resetting timer for light %s.", self.light_entity)
-        self.last_motion_time = datetime.now()
+        self.motion_at = self.hass.loop.time()
+        self._schedule_timeout()
+
+    @callback
+    def _schedule_timeout(self):
+        """Hand the next auto-off deadline of this light to the scheduler."""
+        if self._torn_down:
+            # The scheduler entry may belong to a reloaded instance by now
+            return
+        scheduler = self.hass.data[DOMAIN]["scheduler"]
+        deadline = self._deadline()
+        if deadline is None:
+            scheduler.cancel(self.light_entity)
+        else:
+            scheduler.schedule(self.light_entity, deadline)
+
+    def _deadline(self):
+        """Loop time the light is due to turn off, None without a timer."""
+        auto_off = self._table.auto_off[self._row]
+        motion_at = self._table.motion_at[self._row]
+        if auto_off <= 0 or motion_at != motion_at:  # nan when idle
+            return None
+        return motion_at + auto_off
+
+    @callback
+    def _start_speculative_timer(self):
+        """Start the timer so it runs out after PREACTIVATION_TIMEOUT."""
+        auto_off = float(self._table.auto_off[self._row])
+        self.motion_at = self.hass.loop.time() - max(
+            0.0, auto_off - PREACTIVATION_TIMEOUT
+        )
+        self._schedule_timeout()
+
+    async def _light_smart_turn_on(self, speculative: bool = False):
+        """Turn on the light if it was turned off by the integration.
 
-    async def _light_smart_turn_on(self, light_entity_state):
-        """Turn on the light if it was turned off by the integration."""
+        A speculative turn-on, ahead of motion next door, follows the same
+        rules but only gets a short timer until someone shows up.
+        """
         if (
-            not light_entity_state           # 1. light missing
-            or light_entity_state.state != "off"  # 2. already on
-            or not self.off_by_integration   # 3. turned off manually
+            self._intended_state() != LIGHT_OFF  # 1. missing or already on
+            or not self.off_by_integration   # 2. turned off manually
         ):
             _LOGGER.debug(
                 "Skipping smart turn-on, light=%s, state=%s, off_by_integration=%s",
                 self.light_entity,
-                light_entity_state.state if light_entity_state else None,
+                LIGHT_STATE_NAMES.get(self.light_state),
                 self.off_by_integration,
             )
             return
-        # If there is light sensor defined and conditions are not met
+        # If the sensor or the sun say it is bright enough
         # return to prevent turning on
-        if self.illuminance_sensor and self.illuminance_threshold:
-            ill_state = self.hass.states.get(self.illuminance_sensor)
-            if ill_state is None:
-                _LOGGER.warning(
-                    "Illuminance sensor %s missing for %s",
-                    self.illuminance_sensor,
-                    self.light_entity,
-                )
-                return
-
-            # Convert current illuminance to a number safely
-            try:
-                current_illuminance = float(ill_state.state)
-            except (ValueError, TypeError):
-                _LOGGER.warning(
-                    "Invalid illuminance value for %s: %s",
-                    self.illuminance_sensor,
-                    ill_state.state,
-                )
-                return
-
-            if current_illuminance > self.illuminance_threshold:
-                _LOGGER.debug(
-                    "Light check for %s, %s above %s",
-                    self.light_entity,
-                    current_illuminance,
-                    self.illuminance_threshold,
-                )
-                return
+        if not self.is_dark:
+            _LOGGER.debug(
+                "Light check for %s, %s not below %s or daylight (%s)",
+                self.light_entity,
+                self.illuminance_sensor,
+                self.illuminance_threshold,
+                self.darkness_mode,
+            )
+            return
 
-        _LOGGER.debug("Reactivating light %s due to motion.", self.light_entity)
-        await self._light_reset_timer()
+        if speculative:
+            _LOGGER.debug("Pre-activating light %s ahead of motion.", self.light_entity)
+            # Set first, the light reporting on must not restart the timer
+            self._speculative = True
+            self._start_speculative_timer()
+        else:
+            _LOGGER.debug("Reactivating light %s due to motion.", self.light_entity)
+            await self._light_reset_timer()
         self.off_by_integration = False
-        await self._light_turn_on()
+        if not await self._light_command(LIGHT_ON):
+            # Let the next motion event try again
+            self.off_by_integration = True
+            self._speculative = False
+        elif speculative:
+            self.hass.data[DOMAIN]["metrics"].preactivation_event("switched_on")
+        elif self._motion_detected_at is not None:
+            self.hass.data[DOMAIN]["metrics"].motion_to_turn_on.add(
+                self.hass.loop.time() - self._motion_detected_at
+            )
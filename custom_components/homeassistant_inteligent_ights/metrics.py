@@ -0,0 +1,165 @@
+"""Low overhead runtime metrics for diagnostics and sensors"""
+
+from array import array
+from time import monotonic
+
+from .const import METRICS_BUFFER_SIZE
+
+
+class RingBuffer:
+    """Fixed-size buffer keeping the most recent float samples."""
+
+    __slots__ = ("_values", "_next", "_count")
+
+    def __init__(self, size: int = METRICS_BUFFER_SIZE):
+        self._values = array("d", bytes(8 * size))
+        self._next = 0
+        self._count = 0
+
+    def add(self, value: float):
+        """Store a sample, overwriting the oldest one when full."""
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        if self._count < len(self._values):
+            self._count += 1
+
+    def percentile(self, fraction: float):
+        """Nearest-rank percentile of the buffered samples."""
+        if not self._count:
+            return None
+        ordered = sorted(self._values[: self._count])
+        return ordered[min(self._count - 1, round(fraction * (self._count - 1)))]
+
+    def summary(self) -> dict:
+        """Statistics of the buffered samples, computed on read only."""
+        if not self._count:
+            return {"count": 0}
+        ordered = sorted(self._values[: self._count])
+        last = self._count - 1
+        return {
+            "count": self._count,
+            "min": ordered[0],
+            "p50": ordered[round(0.5 * last)],
+            "p95": ordered[round(0.95 * last)],
+            "max": ordered[-1],
+        }
+
+
+class StateClock:
+    """Tracks how long a value has been held and the total time per value."""
+
+    __slots__ = ("value", "since", "totals")
+
+    def __init__(self, value):
+        self.value = value
+        self.since = monotonic()
+        self.totals: dict = {}
+
+    def set(self, value):
+        """Switch to a new value, booking the time spent in the old one."""
+        if value == self.value:
+            return
+        now = monotonic()
+        self.totals[self.value] = self.totals.get(self.value, 0.0) + now - self.since
+        self.value = value
+        self.since = now
+
+    def as_dict(self) -> dict:
+        now = monotonic()
+        totals = dict(self.totals)
+        totals[self.value] = totals.get(self.value, 0.0) + now - self.since
+        return {
+            "value": self.value,
+            "for_seconds": now - self.since,
+            "total_seconds": {str(key): total for key, total in totals.items()},
+        }
+
+
+class IntegrationMetrics:
+    """Counters and latency histograms shared by the whole integration."""
+
+    def __init__(self):
+        self.events_by_sensor: dict = {}
+        self.suppressed_by_sensor: dict = {}  # motion edges dropped by the debounce
+        self.service_calls: dict = {}  # service -> number of calls
+        self.entities_commanded = 0
+        self.commands: dict = {}  # outcome -> count, e.g. deduplicated or superseded
+        self.command_queue_depth = 0  # lights waiting for the rate limit
+        self.command_queue_peak = 0
+        self.command_wait: dict = {}  # service -> RingBuffer of seconds queued
+        self.command_wait_max: dict = {}  # service -> longest wait since start
+        self.preactivations: dict = {}  # switched_on / used / missed -> count
+        self.scheduler_lateness = RingBuffer()
+        self.check_timeout_duration = RingBuffer()
+        self.motion_to_turn_on = RingBuffer()
+
+    @property
+    def events_handled(self) -> int:
+        return sum(self.events_by_sensor.values())
+
+    @property
+    def events_suppressed(self) -> int:
+        return sum(self.suppressed_by_sensor.values())
+
+    @property
+    def service_calls_total(self) -> int:
+        return sum(self.service_calls.values())
+
+    def sensor_event(self, sensor: str):
+        self.events_by_sensor[sensor] = self.events_by_sensor.get(sensor, 0) + 1
+
+    def sensor_event_suppressed(self, sensor: str):
+        self.suppressed_by_sensor[sensor] = self.suppressed_by_sensor.get(sensor, 0) + 1
+
+    def service_call(self, service: str, entities: int):
+        self.service_calls[service] = self.service_calls.get(service, 0) + 1
+        self.entities_commanded += entities
+
+    def command_event(self, outcome: str):
+        self.commands[outcome] = self.commands.get(outcome, 0) + 1
+
+    def preactivation_event(self, outcome: str):
+        self.preactivations[outcome] = self.preactivations.get(outcome, 0) + 1
+
+    def command_queue(self, depth: int):
+        self.command_queue_depth = depth
+        if depth > self.command_queue_peak:
+            self.command_queue_peak = depth
+
+    def command_waited(self, service: str, seconds: float):
+        wait = self.command_wait.get(service)
+        if wait is None:
+            wait = self.command_wait[service] = RingBuffer()
+        wait.add(seconds)
+        if seconds > self.command_wait_max.get(service, 0.0):
+            self.command_wait_max[service] = seconds
+
+    def command_wait_percentile(self, service: str, fraction: float):
+        wait = self.command_wait.get(service)
+        return wait.percentile(fraction) if wait else None
+
+    def as_dict(self) -> dict:
+        return {
+            "events_handled": self.events_handled,
+            "events_by_sensor": dict(self.events_by_sensor),
+            "events_suppressed": self.events_suppressed,
+            "suppressed_by_sensor": dict(self.suppressed_by_sensor),
+            "service_calls": dict(self.service_calls),
+            "entities_commanded": self.entities_commanded,
+            "commands": dict(self.commands),
+            "preactivations": dict(self.preactivations),
+            "command_queue": {
+                "depth": self.command_queue_depth,
+                "peak": self.command_queue_peak,
+            },
+            "command_wait_seconds": {
+                service: {
+                    **wait.summary(),
+                    "max_since_start": self.command_wait_max.get(service, 0.0),
+                }
+                for service, wait in self.command_wait.items()
+            },
+            "scheduler_lateness_seconds": self.scheduler_lateness.summary(),
+            "check_timeout_seconds": self.check_timeout_duration.summary(),
+            "motion_to_turn_on_seconds": self.motion_to_turn_on.summary(),
+        }
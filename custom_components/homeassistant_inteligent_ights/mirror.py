@@ -0,0 +1,100 @@
+"""One subscription mirroring the state of every controlled light"""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import TrackStates, async_track_state_change_filtered
+
+from .state_table import LIGHT_STATES, LIGHT_UNKNOWN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def light_code(state) -> int:
+    """Small int of a light state object, LIGHT_UNKNOWN when missing."""
+    if state is None:
+        return LIGHT_UNKNOWN
+    return LIGHT_STATES.get(state.state, LIGHT_UNKNOWN)
+
+
+class LightStateMirror:
+    """Keeps the light_state column of every light current.
+
+    A single filtered tracker covers all light entities, whatever their
+    number; the decision paths read the light's row instead of the state
+    machine. Lights registered in the same loop iteration are added to the
+    tracker together, and caught up again at that point so no change in
+    between is lost.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._lights: dict = {}  # light_entity -> LightControl
+        self._added: list = []  # lights registered since the last flush
+        self._tracker = None
+        self._flush_handle = None
+
+    def __len__(self):
+        return len(self._lights)
+
+    @callback
+    def register(self, light_control):
+        """Mirror a light, catching up with the state it has now."""
+        self._lights[light_control.light_entity] = light_control
+        self._sync(light_control)
+        self._added.append(light_control)
+        self._schedule_flush()
+
+    @callback
+    def unregister(self, light_control):
+        if self._lights.get(light_control.light_entity) is light_control:
+            del self._lights[light_control.light_entity]
+            self._schedule_flush()
+
+    def diagnostics(self) -> dict:
+        return {
+            "lights": len(self._lights),
+            "subscribed": self._tracker is not None,
+        }
+
+    @callback
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_soon(self._flush)
+
+    @callback
+    def _flush(self):
+        """Point the tracker at the current set of lights."""
+        self._flush_handle = None
+        if not self._lights:
+            if self._tracker is not None:
+                self._tracker.async_remove()
+                self._tracker = None
+            self._added.clear()
+            return
+        # A new set, the tracker diffs it against the one it holds
+        track_states = TrackStates(False, set(self._lights), set())
+        if self._tracker is None:
+            self._tracker = async_track_state_change_filtered(
+                self.hass, track_states, self._handle_state_change
+            )
+        else:
+            self._tracker.async_update_listeners(track_states)
+        added, self._added = self._added, []
+        for light_control in added:
+            if self._lights.get(light_control.light_entity) is light_control:
+                self._sync(light_control)
+
+    @callback
+    def _sync(self, light_control):
+        """Feed the current state when it differs from the mirrored one."""
+        code = light_code(self.hass.states.get(light_control.light_entity))
+        if code != light_control.light_state:
+            light_control.light_state_seen(code)
+
+    @callback
+    def _handle_state_change(self, event):
+        light_control = self._lights.get(event.data["entity_id"])
+        if light_control is None:
+            return
+        light_control.light_state_seen(light_code(event.data.get("new_state")))
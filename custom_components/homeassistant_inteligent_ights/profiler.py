@@ -0,0 +1,210 @@
+"""On demand timing of the integration's hot paths"""
+
+import asyncio
+import cProfile
+import functools
+import io
+import json
+import logging
+import pstats
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .batcher import CommandBatcher
+from .const import DOMAIN, PROFILE_MODE_CPROFILE, PROFILE_MODE_YAPPI
+from .light_control import LightControl
+from .scheduler import TimeoutScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+# (class, method, name in the summary), per light when the class is LightControl
+HOT_PATHS = (
+    (LightControl, "_handle_motion", "handle_motion"),
+    (LightControl, "_check_timeout", "check_timeout"),
+    (LightControl, "_async_send", "light_command"),
+    (CommandBatcher, "_async_send", "service_call"),
+    (TimeoutScheduler, "_pop_expired", "scheduler_pop_expired"),
+)
+
+# Functions listed from the cProfile/yappi statistics
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class _Timing:
+    """Count, total and max wall time of one hot path (and light)."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else None,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class HotPathProfiler:
+    """Wraps the hot paths with wall clock timers for a while.
+
+    The wrappers are only installed on the classes during a session and the
+    original methods are put back afterwards, so nothing is measured (or
+    paid for) while profiling is off. Timings include the time a path waits
+    for its light's lock and for the service call to return.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.last_summary = None
+        self._originals: list = []
+        self._functions: dict = {}  # name -> _Timing
+        self._lights: dict = {}  # light_entity -> {name: _Timing}
+        self._profiler = None
+        self._mode = None
+        self._started = None
+        self._unsub = None
+
+    @property
+    def running(self) -> bool:
+        return self._unsub is not None
+
+    @callback
+    def async_start(self, duration: float, mode: str):
+        """Start a session that stops by itself after duration seconds."""
+        if self.running:
+            raise HomeAssistantError("Profiling is already running")
+        if mode == PROFILE_MODE_YAPPI:
+            try:
+                import yappi  # pylint: disable=import-outside-toplevel
+            except ImportError as err:
+                raise HomeAssistantError("yappi is not installed") from err
+            yappi.set_clock_type("wall")
+            yappi.start()
+        elif mode == PROFILE_MODE_CPROFILE:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._mode = mode
+        self._functions = {}
+        self._lights = {}
+        for cls, method, name in HOT_PATHS:
+            original = getattr(cls, method)
+            self._originals.append((cls, method, original))
+            setattr(cls, method, self._wrap(original, name, cls is LightControl))
+        self._started = time.perf_counter()
+        self._unsub = async_call_later(self.hass, duration, self._async_stop)
+        _LOGGER.info("Profiling hot paths for %s seconds (%s)", duration, mode)
+
+    @callback
+    def async_shutdown(self):
+        """Put the original methods back without writing a summary."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._restore()
+
+    def _wrap(self, original, name, per_light):
+        timings = self._functions.setdefault(name, _Timing())
+        lights = self._lights
+        if asyncio.iscoroutinefunction(original):
+
+            @functools.wraps(original)
+            async def timed(instance, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await original(instance, *args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    timings.add(elapsed)
+                    if per_light:
+                        lights.setdefault(instance.light_entity, {}).setdefault(
+                            name, _Timing()
+                        ).add(elapsed)
+
+        else:
+
+            @functools.wraps(original)
+            def timed(instance, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return original(instance, *args, **kwargs)
+                finally:
+                    timings.add(time.perf_counter() - started)
+
+        return timed
+
+    def _restore(self):
+        while self._originals:
+            cls, method, original = self._originals.pop()
+            setattr(cls, method, original)
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._mode == PROFILE_MODE_YAPPI:
+            import yappi  # pylint: disable=import-outside-toplevel
+
+            yappi.stop()
+
+    async def _async_stop(self, _now=None):
+        self._unsub = None
+        self._restore()
+        summary = {
+            "finished": dt_util.utcnow().isoformat(),
+            "mode": self._mode,
+            "seconds": round(time.perf_counter() - self._started, 3),
+            "functions": {
+                name: timing.as_dict() for name, timing in self._functions.items()
+            },
+            "lights": {
+                light: {name: timing.as_dict() for name, timing in timings.items()}
+                for light, timings in sorted(
+                    self._lights.items(),
+                    key=lambda item: -sum(t.total for t in item[1].values()),
+                )
+            },
+        }
+        base = self.hass.config.path(
+            f"{DOMAIN}_profile_{dt_util.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        )
+        summary["file"] = f"{base}.json"
+        summary["profile"] = await self.hass.async_add_executor_job(
+            self._profile_stats, f"{base}.prof"
+        )
+        self.last_summary = summary
+        await self.hass.async_add_executor_job(_write_json, summary["file"], summary)
+        _LOGGER.info("Profiling finished, summary written to %s", summary["file"])
+
+    def _profile_stats(self, path: str):
+        """Save the cProfile/yappi statistics, returning their top functions."""
+        if self._mode == PROFILE_MODE_CPROFILE:
+            stats = pstats.Stats(self._profiler, stream=io.StringIO())
+            self._profiler = None
+        elif self._mode == PROFILE_MODE_YAPPI:
+            import yappi  # pylint: disable=import-outside-toplevel
+
+            yappi.get_func_stats().save(path, type="pstat")
+            yappi.clear_stats()
+            stats = pstats.Stats(path, stream=io.StringIO())
+        else:
+            return None
+        stats.dump_stats(path)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return {"file": path, "top": stats.stream.getvalue().splitlines()}
+
+
+def _write_json(path: str, data: dict):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
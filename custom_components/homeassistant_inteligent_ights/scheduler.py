@@ -0,0 +1,100 @@
+"""Deadline driven scheduler for light auto-off timeouts"""
+
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, CONF_GLOBAL_TOGGLE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TimeoutScheduler:
+    """Sleeps until the earliest auto-off deadline of the state table.
+
+    Deadlines are expressed in event loop time (monotonic seconds) and kept
+    in the ``deadline`` column of the ``LightStateTable``, so finding the next
+    deadline and every expired light are single sweeps over one array. The
+    run loop does no work at all while nothing is pending.
+    """
+
+    def __init__(self, hass: HomeAssistant, table):
+        self.hass = hass
+        self.table = table
+        self._wakeup = asyncio.Event()
+        # Deadline the run loop is waiting for, None while idle
+        self._sleeping_until = None
+
+    @callback
+    def schedule(self, light_entity: str, deadline: float):
+        """Set (or move) the expiry deadline for a light, unless it is unloaded."""
+        self.table.set_deadline(light_entity, deadline)
+        if self._sleeping_until is None or deadline < self._sleeping_until:
+            # New earliest deadline, make the run loop recompute its sleep
+            self._wakeup.set()
+
+    @callback
+    def cancel(self, light_entity: str):
+        """Drop the pending deadline for a light, if any."""
+        # The run loop may wake up for nothing once and then recompute
+        self.table.clear_deadline(light_entity)
+
+    @callback
+    def wake(self):
+        """Force the run loop to re-evaluate pending deadlines."""
+        self._wakeup.set()
+
+    def _next_deadline(self):
+        """Return the earliest pending deadline."""
+        return self.table.next_deadline()
+
+    def _pop_expired(self, now: float) -> list:
+        """Clear and return every light whose deadline has passed."""
+        return self.table.pop_expired(now)
+
+    async def async_run(self):
+        """Sleep until the next deadline and check the expired lights."""
+        _LOGGER.info("Starting global light control scheduler")
+        loop = self.hass.loop
+
+        while True:
+            self._wakeup.clear()
+
+            global_toggle = self.hass.data[DOMAIN].get(CONF_GLOBAL_TOGGLE)
+            if global_toggle and not global_toggle.is_on:
+                _LOGGER.debug("Global toggle is OFF, parking the scheduler")
+                # Only the toggle wakes us up, new deadlines wait for it
+                self._sleeping_until = float("-inf")
+                await self._wakeup.wait()
+                continue
+
+            deadline = self._next_deadline()
+            self._sleeping_until = deadline
+            if deadline is None:
+                await self._wakeup.wait()
+                continue
+
+            now = loop.time()
+            if deadline > now:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), deadline - now)
+                    # Woken up by a new earliest deadline
+                    continue
+                except asyncio.TimeoutError:
+                    # Timers may fire within the loop's clock resolution
+                    now = max(loop.time(), deadline)
+
+            expired = self._pop_expired(now)
+            if not expired:
+                # The deadline we slept for was cancelled meanwhile
+                continue
+            self.hass.data[DOMAIN]["metrics"].scheduler_lateness.add(
+                loop.time() - deadline
+            )
+            instances = self.hass.data[DOMAIN]["instances"]
+            for light_entity in expired:
+                light_control = instances.get(light_entity)
+                if light_control is not None:
+                    # Checked side by side so their commands share a batch
+                    self.hass.async_create_task(light_control.check_timeout())
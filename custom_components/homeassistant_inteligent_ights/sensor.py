@@ -0,0 +1,129 @@
+import logging
+from datetime import timedelta
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import Platform, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.entity import EntityCategory
+
+from .const import DOMAIN, CONF_METRICS_SENSORS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Metrics are read on poll only, so the hot paths never touch entities
+SCAN_INTERVAL = timedelta(seconds=60)
+
+METRIC_SENSORS = (
+    # key, name, unit, state class, value function
+    (
+        "events_handled",
+        "Intelli Lights Events Handled",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda metrics: metrics.events_handled,
+    ),
+    (
+        "events_suppressed",
+        "Intelli Lights Events Suppressed",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda metrics: metrics.events_suppressed,
+    ),
+    (
+        "service_calls",
+        "Intelli Lights Service Calls",
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda metrics: metrics.service_calls_total,
+    ),
+    (
+        "scheduler_lateness",
+        "Intelli Lights Scheduler Lateness p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda metrics: _ms(metrics.scheduler_lateness.percentile(0.95)),
+    ),
+    (
+        "check_timeout_duration",
+        "Intelli Lights Timeout Check p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda metrics: _ms(metrics.check_timeout_duration.percentile(0.95)),
+    ),
+    (
+        "motion_to_turn_on",
+        "Intelli Lights Motion To Light p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda metrics: _ms(metrics.motion_to_turn_on.percentile(0.95)),
+    ),
+    (
+        "command_queue_depth",
+        "Intelli Lights Command Queue Depth",
+        None,
+        SensorStateClass.MEASUREMENT,
+        lambda metrics: metrics.command_queue_depth,
+    ),
+    (
+        "turn_on_wait",
+        "Intelli Lights Turn On Queue Wait p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda metrics: _ms(metrics.command_wait_percentile("turn_on", 0.95)),
+    ),
+    (
+        "turn_off_wait",
+        "Intelli Lights Turn Off Queue Wait p95",
+        UnitOfTime.MILLISECONDS,
+        SensorStateClass.MEASUREMENT,
+        lambda metrics: _ms(metrics.command_wait_percentile("turn_off", 0.95)),
+    ),
+)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up the optional runtime metrics sensors for Intelli Lights."""
+    adders = hass.data[DOMAIN]["platforms"].setdefault(Platform.SENSOR, {})
+    adders[entry.entry_id] = async_add_entities
+    if CONF_METRICS_SENSORS not in hass.data[DOMAIN]:
+        async_add_shared(hass, async_add_entities)
+
+
+@callback
+def async_add_shared(hass, async_add_entities):
+    """Add the metrics sensors through one entry's platform."""
+    metrics = hass.data[DOMAIN]["metrics"]
+    sensors = [
+        IntelliLightsMetricSensor(metrics, *description)
+        for description in METRIC_SENSORS
+    ]
+    async_add_entities(sensors)
+    hass.data[DOMAIN][CONF_METRICS_SENSORS] = sensors
+
+
+@callback
+def async_drop_shared(hass):
+    """Forget the metrics sensors once their platform is unloaded."""
+    hass.data[DOMAIN].pop(CONF_METRICS_SENSORS, None)
+
+
+class IntelliLightsMetricSensor(SensorEntity):
+    """Runtime metric of the integration, disabled by default."""
+
+    def __init__(self, metrics, key, name, unit, state_class, value_fn):
+        self._metrics = metrics
+        self._value_fn = value_fn
+        self._attr_name = name
+        self._attr_unique_id = f"{DOMAIN}_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_entity_registry_enabled_default = False
+
+    @property
+    def native_value(self):
+        return self._value_fn(self._metrics)
@@ -0,0 +1,134 @@
+"""Struct-of-arrays storage for the hot per-light fields"""
+
+from array import array
+from itertools import compress
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+# Bits of the flags column
+FLAG_OFF_BY_INTEGRATION = 1
+FLAG_DARK = 2  # below the illuminance threshold
+FLAG_DAYLIGHT = 4  # the sun is up for a light using the sun
+
+# Values of the light_state column, mirrored from the state machine
+LIGHT_UNKNOWN = 0
+LIGHT_OFF = 1
+LIGHT_ON = 2
+LIGHT_UNAVAILABLE = 3
+
+LIGHT_STATES = {"off": LIGHT_OFF, "on": LIGHT_ON, "unavailable": LIGHT_UNAVAILABLE}
+
+_INF = math.inf
+_NAN = math.nan
+
+# column -> (array typecode, numpy dtype, value of an unused row)
+_COLUMNS = {
+    "deadline": ("d", "float64", _INF),  # loop time the auto-off is due, inf if none
+    "motion_at": ("d", "float64", _NAN),  # loop time the timer was restarted, nan if idle
+    "auto_off": ("d", "float64", 0.0),  # auto-off delay in seconds
+    "flags": ("B", "uint8", 0),
+    "light_state": ("B", "uint8", LIGHT_UNKNOWN),
+    "light_changed_at": ("d", "float64", _NAN),  # loop time light_state last changed
+}
+
+
+class LightStateTable:
+    """One row per light, one contiguous array per field.
+
+    Backed by NumPy when it is installed and by ``array`` otherwise, so the
+    scheduler can find the earliest deadline and every expired light with a
+    single pass over one column instead of visiting light objects.
+    """
+
+    def __init__(self, capacity: int = 64, use_numpy: bool = np is not None):
+        self._numpy = use_numpy and np is not None
+        self._capacity = 0
+        self._lights: list = []  # row -> light entity, None when free
+        self._row_by_light: dict = {}
+        self._free: list = []
+        for column, (typecode, dtype, _) in _COLUMNS.items():
+            setattr(self, column, np.empty(0, dtype) if self._numpy else array(typecode))
+        self._grow(max(1, capacity))
+
+    def __len__(self):
+        return len(self._row_by_light)
+
+    def __contains__(self, light_entity):
+        return light_entity in self._row_by_light
+
+    @property
+    def backend(self) -> str:
+        return "numpy" if self._numpy else "array"
+
+    def _grow(self, extra: int):
+        for column, (typecode, dtype, fill) in _COLUMNS.items():
+            values = getattr(self, column)
+            if self._numpy:
+                setattr(self, column, np.concatenate((values, np.full(extra, fill, dtype))))
+            else:
+                values.extend(array(typecode, [fill]) * extra)
+        self._free.extend(range(self._capacity + extra - 1, self._capacity - 1, -1))
+        self._lights.extend([None] * extra)
+        self._capacity += extra
+
+    def add(self, light_entity: str) -> int:
+        """Allocate the row of a light."""
+        if not self._free:
+            self._grow(self._capacity)
+        row = self._free.pop()
+        self._lights[row] = light_entity
+        self._row_by_light[light_entity] = row
+        return row
+
+    def remove(self, light_entity: str) -> "LightStateTable":
+        """Free the row of a light, returning a one row table holding its values.
+
+        An unloaded light keeps its columns in the returned copy, so late tasks
+        writing them never touch a row handed to another light. Calls keyed by
+        entity id, like deadlines, are not covered: a reload may have added the
+        light again, so an unloaded light must stop making them.
+        """
+        row = self._row_by_light.pop(light_entity)
+        detached = LightStateTable(1, self._numpy)
+        detached.add(light_entity)
+        for column, (_, _, fill) in _COLUMNS.items():
+            values = getattr(self, column)
+            getattr(detached, column)[0] = values[row]
+            values[row] = fill
+        self._lights[row] = None
+        self._free.append(row)
+        return detached
+
+    def row(self, light_entity: str):
+        return self._row_by_light.get(light_entity)
+
+    def set_deadline(self, light_entity: str, deadline: float):
+        row = self._row_by_light.get(light_entity)
+        if row is not None:
+            self.deadline[row] = deadline
+
+    def clear_deadline(self, light_entity: str):
+        row = self._row_by_light.get(light_entity)
+        if row is not None:
+            self.deadline[row] = _INF
+
+    def next_deadline(self):
+        """Earliest pending deadline, None when nothing is due."""
+        deadline = float(self.deadline.min()) if self._numpy else min(self.deadline)
+        return None if deadline == _INF else deadline
+
+    def pop_expired(self, now: float) -> list:
+        """Clear and return every light whose deadline has passed."""
+        if self._numpy:
+            rows = np.flatnonzero(self.deadline <= now)
+            self.deadline[rows] = _INF
+            rows = rows.tolist()
+        else:
+            rows = list(compress(range(self._capacity), map(now.__ge__, self.deadline)))
+            for row in rows:
+                self.deadline[row] = _INF
+        return [self._lights[row] for row in rows]
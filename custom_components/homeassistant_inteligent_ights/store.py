@@ -0,0 +1,98 @@
+"""Persist the controller state of every light across restarts"""
+
+import logging
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_KEY, STORAGE_VERSION, STORAGE_SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LightStateStore:
+    """Saves ``off_by_integration``, ``last_motion_time`` and learned delays.
+
+    Changes only mark their light dirty; a single delayed write then
+    refreshes the dirty lights and saves everything at once. State of lights
+    that are not loaded (yet) is kept so unloading or reloading an entry
+    does not lose it.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._lights: dict = {}  # light_entity -> saved state
+        self._dirty: set = set()  # loaded lights changed since the last write
+        self._load_task = None
+        self._pending = False
+
+    async def async_load(self):
+        """Read the saved state once per Home Assistant run."""
+        # Entries set up concurrently all wait for the same read
+        if self._load_task is None:
+            self._load_task = self.hass.async_create_task(self._async_load())
+        await self._load_task
+
+    async def _async_load(self):
+        data = await self._store.async_load() or {}
+        self._lights = data.get("lights", {})
+        _LOGGER.debug("Restored state of %s light(s)", len(self._lights))
+
+    @callback
+    def restore(self, light_control):
+        """Hand a light its saved state and reconcile it."""
+        saved = self._lights.get(light_control.light_entity) or {}
+        last_motion_time = saved.get("last_motion_time")
+        light_control.restore(
+            saved.get("off_by_integration", False),
+            datetime.fromisoformat(last_motion_time) if last_motion_time else None,
+            saved.get("adaptive"),
+        )
+
+    @callback
+    def release(self, light_control):
+        """Keep the state of a light that is being unloaded."""
+        self._lights[light_control.light_entity] = self._light_data(light_control)
+        self._dirty.discard(light_control.light_entity)
+        self.async_schedule_save()
+
+    @callback
+    def forget(self, light_entities):
+        """Drop the saved state of lights that are no longer configured."""
+        for light_entity in light_entities:
+            self._lights.pop(light_entity, None)
+        self.async_schedule_save()
+
+    @callback
+    def async_schedule_save(self, light_control=None):
+        """Mark a light dirty, writing it with the next delayed save."""
+        if light_control is not None:
+            self._dirty.add(light_control.light_entity)
+        if self._pending:
+            return
+        self._pending = True
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @staticmethod
+    def _light_data(light_control) -> dict:
+        last_motion_time = light_control.last_motion_time
+        adaptive = light_control.adaptive
+        return {
+            "off_by_integration": light_control.off_by_integration,
+            "last_motion_time": last_motion_time.isoformat() if last_motion_time else None,
+            "adaptive": adaptive.as_state() if adaptive is not None else None,
+        }
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Refresh the dirty lights, called by the store right before writing."""
+        self._pending = False
+        instances = self.hass.data[DOMAIN]["instances"]
+        for light_entity in self._dirty:
+            # Unloaded lights were saved by release()
+            if (light_control := instances.get(light_entity)) is not None:
+                self._lights[light_entity] = self._light_data(light_control)
+        self._dirty.clear()
+        return {"lights": dict(self._lights)}
@@ -1,27 +1,47 @@
 import logging
 from homeassistant.components.switch import SwitchEntity
+from homeassistant.const import Platform
+from homeassistant.core import callback
 from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.restore_state import RestoreEntity
 
-from .const import DOMAIN, CONF_GLOBAL_TOGGLE
+from .const import DOMAIN, CONF_GLOBAL_TOGGLE, CONF_ZONES
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    """Set up the global toggle switch for Intelli Lights."""
+    """Set up the global toggle and the floor/area switches for Intelli Lights."""
+    adders = hass.data[DOMAIN]["platforms"].setdefault(Platform.SWITCH, {})
+    adders[entry.entry_id] = async_add_entities
     if CONF_GLOBAL_TOGGLE not in hass.data[DOMAIN]:
-        switch = GlobalToggleSwitch()
-        async_add_entities([switch], update_before_add=True)
-        hass.data[DOMAIN][CONF_GLOBAL_TOGGLE] = switch
+        async_add_shared(hass, async_add_entities)
+
+
+@callback
+def async_add_shared(hass, async_add_entities):
+    """Add the switches shared by all entries through one entry's platform."""
+    switch = GlobalToggleSwitch(hass.data[DOMAIN][CONF_ZONES].global_on)
+    async_add_entities([switch], update_before_add=True)
+    hass.data[DOMAIN][CONF_GLOBAL_TOGGLE] = switch
+    # Switches of zones found later are added as their lights show up
+    hass.data[DOMAIN][CONF_ZONES].async_set_add_entities(async_add_entities)
+
+
+@callback
+def async_drop_shared(hass):
+    """Forget the shared switches once their platform is unloaded."""
+    hass.data[DOMAIN].pop(CONF_GLOBAL_TOGGLE, None)
+    hass.data[DOMAIN][CONF_ZONES].async_set_add_entities(None)
 
 
 class GlobalToggleSwitch(SwitchEntity):
     """Global enable/disable switch for Intelli Lights."""
 
-    def __init__(self):
+    def __init__(self, is_on: bool = True):
         self._attr_name = "Intelli Lights Enabled"
         self._attr_unique_id = CONF_GLOBAL_TOGGLE
-        self._is_on = True
+        self._is_on = is_on
         self._attr_entity_category = (
             EntityCategory.CONFIG
         )  # optional: shows in settings
@@ -33,10 +53,22 @@ class GlobalToggleSwitch(SwitchEntity):
     async def async_turn_on(self, **kwargs):
         self._is_on = True
         self.async_write_ha_state()
+        domain_data = self.hass.data[DOMAIN]
+        domain_data[CONF_ZONES].set_global(True)
+        domain_data["dispatcher"].resume()
+        # One pass so timers follow what the lights did meanwhile
+        for light_control in domain_data["instances"].values():
+            light_control.reconcile()
+        # Let the parked scheduler pick up timeouts that expired meanwhile
+        domain_data["scheduler"].wake()
 
     async def async_turn_off(self, **kwargs):
         self._is_on = False
         self.async_write_ha_state()
+        # Nothing listens or wakes up until the toggle is back on
+        self.hass.data[DOMAIN][CONF_ZONES].set_global(False)
+        self.hass.data[DOMAIN]["dispatcher"].suspend()
+        self.hass.data[DOMAIN]["scheduler"].wake()
 
     @property
     def should_poll(self) -> bool:
@@ -49,3 +81,43 @@ class GlobalToggleSwitch(SwitchEntity):
     @property
     def unique_id(self) -> str:
         return self._attr_unique_id
+
+
+class ZoneToggleSwitch(SwitchEntity, RestoreEntity):
+    """Enable/disable switch for the lights of one floor or area."""
+
+    _attr_should_poll = False
+
+    def __init__(self, zones, zone: str, name: str, is_on: bool = True):
+        self._zones = zones
+        self._zone = zone
+        self._attr_name = f"Intelli Lights {name}"
+        self._attr_unique_id = f"{DOMAIN}_{zone}"
+        self._attr_entity_category = EntityCategory.CONFIG
+        self._is_on = is_on
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        # Keep an area disabled across restarts, e.g. while it is cleaned
+        last_state = await self.async_get_last_state()
+        if last_state is not None and last_state.state == "off":
+            self._is_on = False
+            self._zones.set_zone(self._zone, False)
+
+    @property
+    def is_on(self) -> bool:
+        return self._is_on
+
+    @property
+    def extra_state_attributes(self):
+        return {"zone": self._zone}
+
+    async def async_turn_on(self, **kwargs):
+        self._is_on = True
+        self.async_write_ha_state()
+        self._zones.set_zone(self._zone, True)
+
+    async def async_turn_off(self, **kwargs):
+        self._is_on = False
+        self.async_write_ha_state()
+        self._zones.set_zone(self._zone, False)
@@ -0,0 +1,147 @@
+"""Per floor and per area enable switches gating the lights below them"""
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ZoneManager:
+    """Keeps every light's effective enabled flag up to date.
+
+    A light is enabled when the global toggle, its floor and its area are
+    all on. The flag is recomputed only for the lights below a switch when
+    that switch changes, so the hot paths just read ``light_control.enabled``.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.global_on = True
+        self._zone_on: dict = {}  # zone key -> bool
+        self._zone_names: dict = {}  # zone key -> display name
+        self._zones_by_light: dict = {}  # light_entity -> tuple of zone keys
+        self._lights_by_zone: dict = {}  # zone key -> {light_entity: LightControl}
+        self._switches: dict = {}  # zone key -> switch entity
+        self._add_entities = None
+
+    @callback
+    def register(self, light_control):
+        """Attach a light to the zones of its area and floor."""
+        self.unregister(light_control)
+        zones = self._resolve_zones(light_control.light_entity)
+        self._zones_by_light[light_control.light_entity] = zones
+        for zone in zones:
+            self._lights_by_zone.setdefault(zone, {})[
+                light_control.light_entity
+            ] = light_control
+            if zone not in self._switches:
+                self._create_switch(zone)
+        self._refresh(light_control)
+
+    @callback
+    def unregister(self, light_control):
+        for zone in self._zones_by_light.pop(light_control.light_entity, ()):
+            lights = self._lights_by_zone.get(zone, {})
+            lights.pop(light_control.light_entity, None)
+            if not lights:
+                self._lights_by_zone.pop(zone, None)
+
+    @callback
+    def zones_of(self, light_entity: str) -> tuple:
+        return self._zones_by_light.get(light_entity, ())
+
+    @callback
+    def set_global(self, is_on: bool):
+        """Apply the global toggle to every light."""
+        self.global_on = is_on
+        for light_control in self.hass.data[DOMAIN]["instances"].values():
+            self._refresh(light_control)
+
+    @callback
+    def set_zone(self, zone: str, is_on: bool):
+        """Apply a floor/area switch to the lights below it."""
+        self._zone_on[zone] = is_on
+        for light_control in list(self._lights_by_zone.get(zone, {}).values()):
+            was_enabled = light_control.enabled
+            self._refresh(light_control)
+            if light_control.enabled and not was_enabled:
+                # Timers follow what the light did while it was disabled
+                light_control.reconcile()
+
+    @callback
+    def async_set_add_entities(self, add_entities):
+        """Called by the switch platform owning the zone switches.
+
+        None drops the switches of an unloaded platform; the next platform
+        adds every known zone again.
+        """
+        self._add_entities = add_entities
+        self._switches.clear()
+        if add_entities is None:
+            return
+        for zone in self._lights_by_zone:
+            self._create_switch(zone)
+
+    @callback
+    def _refresh(self, light_control):
+        zone_on = self._zone_on
+        light_control.enabled = self.global_on and all(
+            zone_on.get(zone, True)
+            for zone in self._zones_by_light.get(light_control.light_entity, ())
+        )
+
+    @callback
+    def _create_switch(self, zone: str):
+        if self._add_entities is None:
+            # Added once the switch platform is set up
+            return
+        # Imported here, the switch platform imports this module
+        from .switch import ZoneToggleSwitch  # pylint: disable=import-outside-toplevel
+
+        switch = ZoneToggleSwitch(
+            self, zone, self._zone_names[zone], self._zone_on.get(zone, True)
+        )
+        self._switches[zone] = switch
+        self._add_entities([switch])
+
+    @callback
+    def _resolve_zones(self, light_entity: str) -> tuple:
+        """Zone keys of the floor and area a light is placed in."""
+        entry = er.async_get(self.hass).async_get(light_entity)
+        if entry is None:
+            return ()
+        area_id = entry.area_id
+        if area_id is None and entry.device_id is not None:
+            device = dr.async_get(self.hass).async_get(entry.device_id)
+            area_id = device.area_id if device else None
+        if area_id is None:
+            return ()
+        area = ar.async_get(self.hass).async_get_area(area_id)
+        if area is None:
+            return ()
+
+        zones = []
+        floor_id = getattr(area, "floor_id", None)
+        if floor_id is not None:
+            zone = f"floor_{floor_id}"
+            self._zone_names.setdefault(zone, f"{self._floor_name(floor_id)} floor")
+            zones.append(zone)
+        zone = f"area_{area_id}"
+        self._zone_names.setdefault(zone, area.name)
+        zones.append(zone)
+        return tuple(zones)
+
+    def _floor_name(self, floor_id: str) -> str:
+        try:
+            # pylint: disable-next=import-outside-toplevel
+            from homeassistant.helpers import floor_registry as fr
+        except ImportError:
+            return floor_id
+        floor = fr.async_get(self.hass).async_get_floor(floor_id)
+        return floor.name if floor else floor_id